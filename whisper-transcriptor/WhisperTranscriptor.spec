@@ -5,12 +5,19 @@ PyInstaller spec file para Whisper Transcriptor
 Uso:
     pyinstaller WhisperTranscriptor.spec
 
+Build recortado: genera modulos_runtime.json con 'python build_exe.py --recortado'
+y ejecuta con la variable WHISPER_RECORTADO=1 para excluir los módulos que el
+análisis marcó como no usados. Si el código cambió desde el análisis, el build
+se detiene para no aplicar exclusiones desactualizadas.
+
 Este archivo de especificación define cómo construir el ejecutable.
 Puedes modificarlo según tus necesidades.
 """
 
 import os
 import sys
+import json
+import hashlib
 from pathlib import Path
 
 # Encontrar la ruta de whisper para incluir sus assets
@@ -25,6 +32,25 @@ def get_whisper_path():
 whisper_path = get_whisper_path()
 whisper_assets = whisper_path / 'assets'
 
+# Exclusiones del análisis de módulos en ejecución (solo si se piden)
+runtime_excludes = []
+if os.environ.get('WHISPER_RECORTADO') == '1':
+    if not os.path.exists('modulos_runtime.json'):
+        print("ERROR: Falta modulos_runtime.json. Ejecuta: python build_exe.py --recortado")
+        sys.exit(1)
+    with open('modulos_runtime.json', encoding='utf-8') as f:
+        analisis = json.load(f)
+    # Misma huella que huella_fuentes() en build_exe.py
+    sha = hashlib.sha256()
+    for path in sorted(Path('.').glob('*.py')):
+        sha.update(path.name.encode())
+        sha.update(path.read_bytes())
+    if analisis.get('fuentes') != sha.hexdigest():
+        print("ERROR: modulos_runtime.json está desactualizado. Ejecuta: python build_exe.py --recortado")
+        sys.exit(1)
+    runtime_excludes = analisis['excluidos']
+    print(f"Excluyendo módulos no usados: {', '.join(runtime_excludes)}")
+
 block_cipher = None
 
 # Análisis del script principal
@@ -37,17 +63,21 @@ a = Analysis(
         (str(whisper_assets), 'whisper/assets'),
     ],
     hiddenimports=[
-        'whisper',
-        'torch',
-        'torchaudio', 
-        'numpy',
-        'tiktoken',
-        'tiktoken_ext',
-        'tiktoken_ext.openai_public',
-        'regex',
-        'ffmpeg',
-        'numba',
-        'llvmlite',
+        m for m in [
+            'whisper',
+            'torch',
+            'torchaudio', 
+            'numpy',
+            'tiktoken',
+            'tiktoken_ext',
+            'tiktoken_ext.openai_public',
+            'regex',
+            'ffmpeg',
+            'numba',
+            'llvmlite',
+        ]
+        # Un módulo excluido no puede seguir como import oculto
+        if m.split('.')[0] not in runtime_excludes
     ],
     hookspath=[],
     hooksconfig={},
@@ -59,7 +89,7 @@ a = Analysis(
         'jupyter',
         'notebook',
         'scipy',  # No necesario para inferencia básica
-    ],
+    ] + runtime_excludes,
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
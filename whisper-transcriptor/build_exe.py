@@ -2,14 +2,113 @@
 """
 Script de construcción para crear el ejecutable de Whisper Transcriptor
 Usa PyInstaller para empaquetar la aplicación
+
+Uso:
+    python build_exe.py                          # Build completo
+    python build_exe.py --recortado              # Excluye los módulos que no se usan en ejecución
+    python build_exe.py --paquetes tiny base small --preinstalar tiny
+    python build_exe.py --medir                  # Solo medir la distribución existente
 """
 
 import os
 import sys
+import json
+import time
 import shutil
+import hashlib
+import zipfile
+import argparse
 import subprocess
 from pathlib import Path
 
+# Resultado del análisis de módulos (lo lee también WhisperTranscriptor.spec)
+ANALISIS_FILE = 'modulos_runtime.json'
+
+# Caché de modelos descargados para crear los paquetes
+MODELOS_CACHE = Path('modelos_cache')
+
+# Modelo usado para ejecutar una transcripción real durante el análisis
+MODELO_ANALISIS = 'tiny'
+
+# Paquetes grandes que solo se excluyen si el análisis confirma que no se usan
+CANDIDATOS_EXCLUSION = [
+    'torchaudio',
+    'numba',
+    'llvmlite',
+    'scipy',
+    'sympy',
+    'networkx',
+    'torch.distributed',
+    'torch.testing',
+    'torch.onnx',
+    'torch._dynamo',
+    'torch._inductor',
+    'torch.utils.tensorboard',
+    'torch.utils.benchmark',
+    'unittest',
+    'pydoc_data',
+]
+
+# Script que se ejecuta en un proceso aparte para registrar los módulos importados.
+# Recorre los mismos caminos que la aplicación: planificador, decodificación con
+# FFmpeg, vocabulario, diarización, salidas SRT/JSON y dictado en vivo.
+SCRIPT_ANALISIS = """
+import io, json, os, sys, tempfile, wave
+sys.path.insert(0, '.')
+import numpy as np
+import transcriptor
+transcriptor.setup_ffmpeg()
+import whisper
+import diarizacion
+import transcripcion_en_vivo
+from planificador import Planificador, INTERACTIVA
+from postproceso import Postprocesador
+try:
+    import sounddevice
+except ImportError:
+    pass
+
+carpeta = tempfile.mkdtemp()
+wav_path = os.path.join(carpeta, 'analisis.wav')
+t = np.arange(3 * 16000) / 16000
+pcm = (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16)
+with wave.open(wav_path, 'wb') as f:
+    f.setnchannels(1)
+    f.setsampwidth(2)
+    f.setframerate(16000)
+    f.writeframes(pcm.tobytes())
+
+model = whisper.load_model(sys.argv[1], download_root=sys.argv[2])
+vocabulario = os.path.join(carpeta, 'vocabulario.txt')
+with open(vocabulario, 'w', encoding='utf-8') as f:
+    f.write('open ai => OpenAI\\n')
+postprocesador = Postprocesador.desde_archivo(vocabulario)
+
+def transcribir(trabajo):
+    audio = whisper.load_audio(trabajo.audio_path)
+    diarizador = diarizacion.Diarizador(audio, diarizacion.detectar_voz(audio)).iniciar()
+    result = model.transcribe(audio, language='es', fp16=False, verbose=None,
+                              initial_prompt=postprocesador.prompt())
+    segmentos = diarizador.etiquetar(postprocesador.procesar_segmentos(result['segments']))
+    diarizacion.formatear_texto(segmentos)
+    diarizacion.guardar_salidas(segmentos, os.path.join(carpeta, 'analisis'))
+
+Planificador(max_trabajos=1).enviar(transcribir, wav_path, sys.argv[1], INTERACTIVA, 'analisis').result()
+
+fuente = transcripcion_en_vivo.FuentePCM(io.BytesIO(pcm.tobytes()))
+transcripcion_en_vivo.TranscriptorEnVivo(model).procesar(fuente)
+
+json.dump(sorted(sys.modules), sys.stdout)
+"""
+
+def huella_fuentes():
+    """SHA-256 de los .py del proyecto, para detectar análisis desactualizados"""
+    sha = hashlib.sha256()
+    for path in sorted(Path('.').glob('*.py')):
+        sha.update(path.name.encode())
+        sha.update(path.read_bytes())
+    return sha.hexdigest()
+
 def find_whisper_assets():
     """Encuentra los assets de Whisper necesarios para el ejecutable"""
     import whisper
@@ -24,7 +123,35 @@ def find_torch_libs():
     torch_path = Path(torch.__file__).parent
     return str(torch_path)
 
-def build_executable():
+def analizar_modulos():
+    """Ejecuta una transcripción real y devuelve los módulos que se importaron"""
+    print("\n=== Analizando módulos usados en ejecución ===\n")
+    MODELOS_CACHE.mkdir(exist_ok=True)
+    
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT_ANALISIS, MODELO_ANALISIS, str(MODELOS_CACHE)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        print("ERROR: No se pudo completar el análisis de módulos")
+        return None
+    
+    usados = json.loads(result.stdout)
+    excluidos = [
+        candidato for candidato in CANDIDATOS_EXCLUSION
+        if not any(m == candidato or m.startswith(candidato + '.') for m in usados)
+    ]
+    
+    with open(ANALISIS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'fuentes': huella_fuentes(), 'usados': usados, 'excluidos': excluidos}, f, indent=2)
+    
+    print(f"Módulos importados: {len(usados)}")
+    print(f"Módulos excluidos: {', '.join(excluidos) if excluidos else '(ninguno)'}")
+    print(f"Análisis guardado en: {ANALISIS_FILE}")
+    return usados, excluidos
+
+def build_executable(recortado=False):
     """Construye el ejecutable usando PyInstaller"""
     
     print("\n=== Preparando construcción ===\n")
@@ -45,6 +172,12 @@ def build_executable():
         print("ERROR: PyTorch no está instalado. Ejecuta: pip install torch")
         return False
     
+    analisis = None
+    if recortado:
+        analisis = analizar_modulos()
+        if analisis is None:
+            return False
+    
     # Limpiar builds anteriores
     for folder in ['build', 'dist']:
         if os.path.exists(folder):
@@ -83,11 +216,27 @@ def build_executable():
         '--exclude-module=IPython',
         '--exclude-module=jupyter',
         '--exclude-module=notebook',
-        
-        # Script principal
-        'transcriptor.py'
     ]
     
+    if analisis:
+        usados, excluidos = analisis
+        # Solo los assets y los submódulos de whisper que realmente se usan
+        cmd.remove('--collect-all=whisper')
+        cmd.append('--collect-data=whisper')
+        cmd.extend(f'--hidden-import={m}' for m in usados if m.startswith('whisper.'))
+        cmd.extend(f'--exclude-module={m}' for m in excluidos)
+        # Un módulo excluido no puede seguir como import oculto
+        cmd = [
+            c for c in cmd
+            if not (c.startswith('--hidden-import=') and
+                    any(c.split('=', 1)[1] == m or c.split('=', 1)[1].startswith(m + '.') for m in excluidos))
+        ]
+        # Las DLL comprimidas con UPX se descomprimen en cada arranque
+        cmd.append('--noupx')
+    
+    # Script principal
+    cmd.append('transcriptor.py')
+    
     print("\n=== Ejecutando PyInstaller ===\n")
     print("Este proceso puede tardar varios minutos...\n")
     
@@ -99,6 +248,102 @@ def build_executable():
         print(f"\nERROR: PyInstaller falló con código {e.returncode}")
         return False
 
+def calcular_sha256(path):
+    """Calcula el SHA-256 de un archivo leyéndolo por bloques"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def crear_paquetes_modelos(modelos, preinstalar):
+    """Crea un paquete .zip por modelo con su checksum y preinstala los indicados.
+
+    Cada modelo lleva su propio manifiesto modelos/<nombre>.json, de modo que
+    se pueden descomprimir varios paquetes en la misma carpeta. La aplicación
+    lo comprueba al cargar el modelo (get_models_dir).
+    """
+    import whisper
+    
+    dist_path = Path('dist/WhisperTranscriptor')
+    paquetes_path = Path('dist/paquetes_modelos')
+    paquetes_path.mkdir(parents=True, exist_ok=True)
+    MODELOS_CACHE.mkdir(exist_ok=True)
+    
+    print("\n=== Creando paquetes de modelos ===\n")
+    
+    manifest = {}
+    for nombre in modelos:
+        print(f"Preparando modelo '{nombre}'...")
+        # whisper descarga y verifica el checksum oficial del modelo
+        model_file = Path(whisper._download(whisper._MODELS[nombre], str(MODELOS_CACHE), False))
+        entry = {
+            'archivo': model_file.name,
+            'sha256': calcular_sha256(model_file),
+            'bytes': model_file.stat().st_size,
+        }
+        manifest[nombre] = entry
+        
+        # Los .pt ya están comprimidos: se guardan sin volver a comprimir
+        paquete = paquetes_path / f'modelo_{nombre}.zip'
+        with zipfile.ZipFile(paquete, 'w', zipfile.ZIP_STORED) as zip_ref:
+            zip_ref.write(model_file, f'modelos/{model_file.name}')
+            zip_ref.writestr(f'modelos/{nombre}.json', json.dumps(entry, indent=2))
+        print(f"  - {paquete.name} ({entry['bytes'] / (1024*1024):.1f} MB)")
+        
+        if nombre in preinstalar:
+            modelos_dist = dist_path / 'modelos'
+            modelos_dist.mkdir(exist_ok=True)
+            shutil.copy(model_file, modelos_dist)
+            with open(modelos_dist / f'{nombre}.json', 'w', encoding='utf-8') as f:
+                json.dump(entry, f, indent=2)
+            print(f"  - Preinstalado en {modelos_dist}")
+    
+    with open(paquetes_path / 'SHA256SUMS.txt', 'w', encoding='utf-8') as f:
+        for entry in manifest.values():
+            f.write(f"{entry['sha256']}  modelos/{entry['archivo']}\n")
+
+def medir_build(tras_build=True):
+    """Mide el tamaño de la distribución y el tiempo de arranque del ejecutable.
+
+    Justo después del build los archivos siguen en la caché del sistema, así
+    que ningún arranque es en frío. Para medirlo de verdad hay que reiniciar
+    el equipo y ejecutar 'python build_exe.py --medir'.
+    """
+    dist_path = Path('dist/WhisperTranscriptor')
+    
+    total = 0
+    archivos = 0
+    for item in dist_path.rglob('*'):
+        if item.is_file() and item.parent.name != 'modelos':
+            total += item.stat().st_size
+            archivos += 1
+    
+    print("\n=== Mediciones ===\n")
+    print(f"Tamaño (sin modelos): {total / (1024*1024):.1f} MB en {archivos} archivos")
+    
+    exe_name = 'WhisperTranscriptor.exe' if sys.platform == 'win32' else 'WhisperTranscriptor'
+    exe_path = dist_path / exe_name
+    if not exe_path.exists():
+        return
+    
+    if tras_build:
+        etiquetas = ('Primer arranque (caché del sistema caliente tras el build)', 'Arranque en caliente')
+    else:
+        etiquetas = ('Primer arranque (en frío solo si el equipo se acaba de reiniciar)', 'Arranque en caliente')
+    
+    for etiqueta in etiquetas:
+        inicio = time.perf_counter()
+        try:
+            subprocess.run([str(exe_path), '--medir-arranque'], timeout=600, check=True)
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"{etiqueta}: no se pudo medir ({e})")
+            return
+        print(f"{etiqueta} (interfaz + whisper/torch): {time.perf_counter() - inicio:.1f} s")
+    
+    if tras_build:
+        print("Para medir el arranque en frío: reinicia el equipo y ejecuta 'python build_exe.py --medir'")
+
 def post_build():
     """Tareas post-construcción"""
     dist_path = Path('dist/WhisperTranscriptor')
@@ -125,8 +370,10 @@ Para usar esta aplicación:
 
 3. Ejecuta WhisperTranscriptor.exe
 
-NOTA: La primera vez que uses cada modelo, se descargará automáticamente.
-      Esto requiere conexión a internet.
+NOTA: Los modelos que estén en la carpeta 'modelos' se usan sin conexión.
+      Para añadir uno, descomprime su paquete (modelo_<nombre>.zip) aquí.
+      Los demás se descargarán automáticamente la primera vez que se usen,
+      lo que requiere conexión a internet.
 
 Modelos disponibles (de menor a mayor calidad/tamaño):
 - tiny: ~75MB, más rápido, menor precisión
@@ -160,12 +407,31 @@ Modelos disponibles (de menor a mayor calidad/tamaño):
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Construye el ejecutable de Whisper Transcriptor")
+    parser.add_argument('--recortado', action='store_true',
+                        help="Analiza los módulos usados y excluye los que no se necesitan")
+    parser.add_argument('--paquetes', nargs='*', default=[], metavar='MODELO',
+                        help="Modelos para los que crear paquetes descargables")
+    parser.add_argument('--preinstalar', nargs='*', default=[], metavar='MODELO',
+                        help="Modelos a incluir ya instalados en la distribución")
+    parser.add_argument('--medir', action='store_true',
+                        help="No construir: solo medir tamaño y arranque de dist/WhisperTranscriptor")
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("  Whisper Transcriptor - Build Tool")
     print("=" * 50)
     
-    if build_executable():
+    if args.medir:
+        medir_build(tras_build=False)
+        return
+    
+    if build_executable(args.recortado):
         post_build()
+        modelos = list(dict.fromkeys(args.paquetes + args.preinstalar))
+        if modelos:
+            crear_paquetes_modelos(modelos, args.preinstalar)
+        medir_build()
         print("\n" + "=" * 50)
         print("  ¡Construcción completada!")
         print("=" * 50)
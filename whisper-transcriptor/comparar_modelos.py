@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Whisper Transcriptor - Comparador de modelos
+Ejecuta los mismos archivos con varios modelos y backends y muestra una
+tabla de precisión (WER/CER) frente a velocidad (factor de tiempo real)
+y memoria máxima, para elegir el modelo más barato que cumpla el objetivo.
+
+Uso:
+    python comparar_modelos.py audio1.mp3 audio2.wav --modelos tiny base small
+    python comparar_modelos.py audio.mp3 --backends whisper faster-whisper --wer-max 0.15
+
+Si junto a un audio existe un archivo <nombre>_referencia.txt se usa como
+transcripción de referencia. Si no, se compara contra la salida del modelo
+más grande de la lista; ese modelo aparece como "ref" (su precisión no se
+ha medido) y no se recomienda.
+
+El WER y el CER de cada modelo se ponderan por la longitud de las
+referencias, de modo que los audios cortos no pesan más que los largos.
+"""
+
+import argparse
+import csv
+import gc
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from transcriptor import get_models_dir, setup_ffmpeg
+
+SAMPLE_RATE = 16000
+
+# Orden de los modelos de menor a mayor coste
+MODELOS = ["tiny", "base", "small", "medium", "large"]
+BACKENDS = ["whisper", "faster-whisper"]
+
+SUFIJO_REFERENCIA = "_referencia.txt"
+
+
+# ----------------------------------------------------------------------
+# Métricas de precisión
+# ----------------------------------------------------------------------
+
+def normalizar_texto(texto):
+    """Pasa a minúsculas y elimina puntuación para comparar transcripciones"""
+    texto = unicodedata.normalize("NFC", texto.lower())
+    texto = re.sub(r"[^\w\s']", " ", texto)
+    return " ".join(texto.split())
+
+def distancia_edicion(referencia, hipotesis):
+    """Distancia de Levenshtein entre dos secuencias (palabras o caracteres).
+
+    Usa rapidfuzz si está instalado; si no, una versión con NumPy que
+    calcula cada fila de la tabla de una vez.
+    """
+    try:
+        from rapidfuzz.distance import Levenshtein
+        return Levenshtein.distance(referencia, hipotesis)
+    except ImportError:
+        pass
+
+    import numpy as np
+
+    if len(referencia) < len(hipotesis):
+        referencia, hipotesis = hipotesis, referencia
+    if not hipotesis:
+        return len(referencia)
+
+    # Convertir los elementos (palabras o caracteres) a enteros
+    vocabulario = {}
+    ref = np.array([vocabulario.setdefault(x, len(vocabulario)) for x in referencia], dtype=np.int32)
+    hyp = np.array([vocabulario.setdefault(x, len(vocabulario)) for x in hipotesis], dtype=np.int32)
+
+    # Se reutilizan los mismos arrays en cada fila para no reservar memoria
+    indices = np.arange(len(hyp) + 1, dtype=np.int32)
+    anterior = indices.copy()
+    candidatos = np.empty_like(anterior)
+    distinto = np.empty(len(hyp), dtype=np.int32)
+    for i, r in enumerate(ref, 1):
+        # Borrado y sustitución se calculan en bloque...
+        np.not_equal(hyp, r, out=distinto)
+        np.add(anterior[:-1], distinto, out=candidatos[1:])
+        np.minimum(candidatos[1:], anterior[1:] + 1, out=candidatos[1:])
+        candidatos[0] = i
+        # ...y la inserción (actual[j-1] + 1) es un mínimo acumulado
+        np.subtract(candidatos, indices, out=anterior)
+        np.minimum.accumulate(anterior, out=anterior)
+        anterior += indices
+    return int(anterior[-1])
+
+def errores_palabras(referencia, hipotesis):
+    """Devuelve (errores, palabras de la referencia)"""
+    ref = normalizar_texto(referencia).split()
+    hyp = normalizar_texto(hipotesis).split()
+    return distancia_edicion(ref, hyp), len(ref)
+
+def errores_caracteres(referencia, hipotesis):
+    """Devuelve (errores, caracteres de la referencia)"""
+    ref = normalizar_texto(referencia)
+    hyp = normalizar_texto(hipotesis)
+    return distancia_edicion(ref, hyp), len(ref)
+
+def tasa_error(errores, longitud):
+    """Errores por unidad de referencia; una referencia vacía solo acierta si no hay errores"""
+    if not longitud:
+        return 0.0 if not errores else 1.0
+    return errores / longitud
+
+def calcular_wer(referencia, hipotesis):
+    """Word Error Rate entre dos textos"""
+    return tasa_error(*errores_palabras(referencia, hipotesis))
+
+def calcular_cer(referencia, hipotesis):
+    """Character Error Rate entre dos textos"""
+    return tasa_error(*errores_caracteres(referencia, hipotesis))
+
+
+# ----------------------------------------------------------------------
+# Medición de memoria
+# ----------------------------------------------------------------------
+
+class MedidorMemoria:
+    """Mide la memoria residente máxima del proceso mientras está activo.
+
+    Requiere psutil (muestreo en un hilo). Sin psutil no se mide: el máximo
+    histórico del proceso (ru_maxrss) incluiría los modelos anteriores.
+    """
+
+    def __init__(self, intervalo=0.05):
+        self.intervalo = intervalo
+        self.pico = None
+        self._detener = threading.Event()
+        self._hilo = None
+        try:
+            import psutil
+            self._proceso = psutil.Process()
+        except ImportError:
+            self._proceso = None
+
+    def __enter__(self):
+        if self._proceso is not None:
+            self.pico = self._proceso.memory_info().rss
+            self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+            self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._hilo is not None:
+            self._detener.set()
+            self._hilo.join()
+        return False
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            self.pico = max(self.pico, self._proceso.memory_info().rss)
+
+
+# ----------------------------------------------------------------------
+# Backends de transcripción
+# ----------------------------------------------------------------------
+
+def cargar_backend(backend, modelo):
+    """Carga un modelo y devuelve una función transcribir(audio, idioma) -> texto.
+
+    El audio es siempre un array float32 a 16 kHz ya decodificado, de modo
+    que todos los modelos comparten la misma decodificación.
+    """
+    if backend == "whisper":
+        import whisper
+        model = whisper.load_model(modelo, download_root=get_models_dir(modelo))
+
+        def transcribir(audio, idioma):
+            result = model.transcribe(audio, language=idioma, fp16=False, verbose=None)
+            return result["text"]
+
+        return transcribir
+
+    if backend == "faster-whisper":
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("faster-whisper no está instalado. Ejecuta: pip install faster-whisper")
+
+        nombre = "large-v3" if modelo == "large" else modelo
+        model = WhisperModel(nombre, device="cpu", compute_type="int8")
+
+        def transcribir(audio, idioma):
+            segments, _ = model.transcribe(audio, language=idioma)
+            return "".join(segment.text for segment in segments)
+
+        return transcribir
+
+    raise ValueError(f"Backend desconocido: {backend}")
+
+def decodificar_audios(archivos):
+    """Decodifica cada archivo una sola vez para compartirlo entre ejecuciones"""
+    import whisper
+
+    audios = {}
+    for archivo in archivos:
+        print(f"Decodificando: {Path(archivo).name}")
+        audios[archivo] = whisper.load_audio(archivo)
+    return audios
+
+def leer_referencia(archivo):
+    """Devuelve el texto de <nombre>_referencia.txt si existe"""
+    ruta = os.path.splitext(archivo)[0] + SUFIJO_REFERENCIA
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            return f.read()
+    return None
+
+
+# ----------------------------------------------------------------------
+# Comparación
+# ----------------------------------------------------------------------
+
+def comparar(archivos, modelos, backends, idioma="es"):
+    """Ejecuta todas las combinaciones y devuelve una fila de resultados por cada una"""
+    audios = decodificar_audios(archivos)
+    duracion_total = sum(len(a) for a in audios.values()) / SAMPLE_RATE
+
+    salidas = {}
+    filas = []
+
+    transcribir = None
+    for backend in backends:
+        for modelo in modelos:
+            # Liberar el modelo anterior para que no cuente en la memoria de éste
+            transcribir = None
+            gc.collect()
+
+            print(f"\n[{backend} / {modelo}] Cargando modelo...")
+            try:
+                with MedidorMemoria() as memoria:
+                    transcribir = cargar_backend(backend, modelo)
+                    inicio = time.perf_counter()
+                    for archivo, audio in audios.items():
+                        print(f"  Transcribiendo: {Path(archivo).name}")
+                        salidas[(backend, modelo, archivo)] = transcribir(audio, idioma)
+                    segundos = time.perf_counter() - inicio
+            except Exception as e:
+                print(f"  ❌ Error: {e}")
+                continue
+
+            filas.append({
+                "backend": backend,
+                "modelo": modelo,
+                "segundos": segundos,
+                "rtf": segundos / duracion_total if duracion_total else 0.0,
+                "memoria_mb": memoria.pico / (1024 * 1024) if memoria.pico else None,
+            })
+
+    # Precisión: contra la referencia si existe, o contra el modelo más grande.
+    # Se suman errores y longitudes de todos los archivos (media ponderada).
+    for fila in filas:
+        clave = (fila["backend"], fila["modelo"])
+        palabras = [0, 0]
+        caracteres = [0, 0]
+        comparados = 0
+        fila["referencia"] = False
+        for archivo in archivos:
+            referencia = leer_referencia(archivo)
+            if referencia is None:
+                origen = _modelo_de_referencia(salidas, archivo)
+                if origen == clave:
+                    # Compararse consigo mismo daría siempre 0%
+                    fila["referencia"] = True
+                    continue
+                referencia = salidas.get(origen + (archivo,)) if origen else None
+            hipotesis = salidas.get(clave + (archivo,))
+            if referencia is None or hipotesis is None:
+                continue
+            for acumulado, (errores, longitud) in ((palabras, errores_palabras(referencia, hipotesis)),
+                                                   (caracteres, errores_caracteres(referencia, hipotesis))):
+                acumulado[0] += errores
+                acumulado[1] += longitud
+            comparados += 1
+        fila["wer"] = tasa_error(*palabras) if comparados else None
+        fila["cer"] = tasa_error(*caracteres) if comparados else None
+
+    return filas
+
+def _modelo_de_referencia(salidas, archivo):
+    """(backend, modelo) más grande disponible (preferentemente whisper) para un archivo"""
+    for modelo in reversed(MODELOS):
+        for backend in BACKENDS:
+            if (backend, modelo, archivo) in salidas:
+                return (backend, modelo)
+    return None
+
+def recomendar(filas, wer_max):
+    """Devuelve la fila más rápida cuyo WER no supera wer_max.
+
+    El modelo usado como referencia queda fuera: su precisión no se ha medido.
+    """
+    validas = [f for f in filas
+               if not f.get("referencia") and f["wer"] is not None and f["wer"] <= wer_max]
+    if not validas:
+        return None
+    return min(validas, key=lambda f: f["rtf"])
+
+def _formato(valor, patron):
+    return patron.format(valor) if valor is not None else "-"
+
+def _formato_precision(fila, campo, patron):
+    """WER/CER de una fila; "ref" para el modelo que hizo de referencia"""
+    if fila.get("referencia"):
+        return "ref"
+    return _formato(fila[campo], patron)
+
+def imprimir_tabla(filas):
+    """Muestra la tabla de resultados en consola"""
+    encabezado = f"{'Backend':<15} {'Modelo':<8} {'WER':>7} {'CER':>7} {'RTF':>7} {'Memoria':>10}"
+    print("\n" + "=" * len(encabezado))
+    print(encabezado)
+    print("=" * len(encabezado))
+    for f in filas:
+        print(f"{f['backend']:<15} {f['modelo']:<8} "
+              f"{_formato_precision(f, 'wer', '{:.1%}'):>7} "
+              f"{_formato_precision(f, 'cer', '{:.1%}'):>7} "
+              f"{f['rtf']:>7.2f} "
+              f"{_formato(f['memoria_mb'], '{:.0f} MB'):>10}")
+    print("=" * len(encabezado))
+    print("RTF = segundos de proceso / segundos de audio (menor es más rápido)")
+    if any(f.get("referencia") for f in filas):
+        print("ref = modelo usado como referencia (sin <nombre>_referencia.txt); no se recomienda")
+    if all(f["memoria_mb"] is None for f in filas):
+        print("Memoria: instala psutil para medirla (pip install psutil)")
+
+def guardar_csv(filas, ruta):
+    """Guarda los resultados en un archivo CSV"""
+    campos = ["backend", "modelo", "wer", "cer", "rtf", "segundos", "memoria_mb"]
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=campos)
+        writer.writeheader()
+        for fila in filas:
+            fila_csv = {c: fila.get(c) for c in campos}
+            if fila.get("referencia"):
+                fila_csv["wer"] = fila_csv["cer"] = "ref"
+            writer.writerow(fila_csv)
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Compara modelos de Whisper en precisión y velocidad")
+    parser.add_argument("archivos", nargs="+", help="Archivos de audio a transcribir")
+    parser.add_argument("--modelos", nargs="+", default=["tiny", "base", "small"], choices=MODELOS)
+    parser.add_argument("--backends", nargs="+", default=["whisper"], choices=BACKENDS)
+    parser.add_argument("--idioma", default="es", help="Código de idioma (vacío para detectar)")
+    parser.add_argument("--wer-max", type=float, default=0.15, help="WER máximo aceptable para la recomendación")
+    parser.add_argument("--csv", help="Guardar los resultados también en este CSV")
+    args = parser.parse_args()
+
+    for archivo in args.archivos:
+        if not os.path.exists(archivo):
+            print(f"❌ El archivo no existe: {archivo}")
+            sys.exit(1)
+
+    setup_ffmpeg()
+
+    # Ordenar modelos de menor a mayor para que la referencia sea el último
+    modelos = sorted(set(args.modelos), key=MODELOS.index)
+    filas = comparar(args.archivos, modelos, args.backends, args.idioma or None)
+
+    if not filas:
+        print("\nNo se pudo ejecutar ningún modelo.")
+        sys.exit(1)
+
+    imprimir_tabla(filas)
+
+    mejor = recomendar(filas, args.wer_max)
+    if mejor:
+        print(f"\n✅ Recomendado (WER <= {args.wer_max:.0%}): {mejor['backend']} / {mejor['modelo']}")
+    elif all(f.get("referencia") for f in filas):
+        print("\n⚠️ Sin <nombre>_referencia.txt hacen falta al menos dos modelos para medir la precisión")
+    else:
+        print(f"\n⚠️ Ningún modelo alcanza un WER <= {args.wer_max:.0%}")
+
+    if args.csv:
+        guardar_csv(filas, args.csv)
+        print(f"💾 Resultados guardados en: {args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Whisper Transcriptor - Diarización (quién habla en cada momento)
+Etapa opcional que trabaja sobre el mismo audio ya decodificado que la
+transcripción, y en paralelo con ella. No cambia lo que recibe Whisper:
+la transcripción es la misma con o sin diarización.
+
+1. Detección de voz por energía (VAD), solo para elegir las ventanas que se
+   agrupan.
+2. Un vector por ventana de 1.5 s: media y desviación del log-mel de cada banda.
+3. Agrupamiento k-means (coseno) eligiendo el número de hablantes por silueta.
+4. Cada segmento de Whisper recibe el hablante con más solapamiento.
+
+El resultado se guarda en texto, SRT y JSON con las etiquetas de hablante.
+
+Uso (medir cuánto añade la diarización a la transcripción):
+    python diarizacion.py reunion.mp3 --modelo base
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# VAD
+VAD_TRAMA = 0.03          # segundos por trama de energía
+VAD_MARGEN_DB = 6.0       # dB por encima del ruido de fondo
+VAD_HUECO_MIN = 0.5       # huecos más cortos se unen
+VAD_REGION_MIN = 0.3      # regiones más cortas se descartan
+VAD_RELLENO = 0.2         # segundos añadidos a cada lado
+
+# Vectores de hablante
+VENTANA = 1.5
+SALTO = 0.75
+FRAMES_POR_SEGUNDO = 100  # log-mel de Whisper: 10 ms por frame
+
+# Agrupamiento
+MAX_HABLANTES = 6
+SILUETA_MIN = 0.1         # por debajo se considera un único hablante
+MUESTRA_SILUETA = 800
+
+
+# ----------------------------------------------------------------------
+# Detección de voz
+# ----------------------------------------------------------------------
+
+def detectar_voz(audio):
+    """Devuelve las regiones con voz como lista de (inicio, fin) en segundos"""
+    trama = int(VAD_TRAMA * SAMPLE_RATE)
+    n = len(audio) // trama
+    if n == 0:
+        return []
+
+    energia = np.square(audio[:n * trama].reshape(n, trama)).mean(axis=1)
+    energia_db = 10 * np.log10(energia + 1e-10)
+    umbral = np.percentile(energia_db, 20) + VAD_MARGEN_DB
+    voz = energia_db > umbral
+
+    # Bordes de las rachas de tramas con voz
+    cambios = np.diff(np.concatenate([[0], voz.astype(np.int8), [0]]))
+    inicios = np.flatnonzero(cambios == 1) * VAD_TRAMA
+    fines = np.flatnonzero(cambios == -1) * VAD_TRAMA
+
+    regiones = unir_regiones(list(zip(inicios, fines)), VAD_HUECO_MIN)
+    duracion = len(audio) / SAMPLE_RATE
+    return [
+        (max(0.0, ini - VAD_RELLENO), min(duracion, fin + VAD_RELLENO))
+        for ini, fin in regiones if fin - ini >= VAD_REGION_MIN
+    ]
+
+def unir_regiones(regiones, hueco_min):
+    """Une las regiones separadas por menos de hueco_min segundos"""
+    unidas = []
+    for ini, fin in regiones:
+        if unidas and ini - unidas[-1][1] < hueco_min:
+            unidas[-1] = (unidas[-1][0], max(unidas[-1][1], fin))
+        else:
+            unidas.append((float(ini), float(fin)))
+    return unidas
+
+
+# ----------------------------------------------------------------------
+# Vectores y agrupamiento
+# ----------------------------------------------------------------------
+
+def calcular_vectores(audio, regiones):
+    """Devuelve (ventanas, vectores): ventanas (inicio, fin) y un vector normalizado por ventana"""
+    import whisper
+
+    mel = whisper.log_mel_spectrogram(audio).numpy()
+
+    ventanas = []
+    for ini, fin in regiones:
+        t = ini
+        while True:
+            t_fin = min(t + VENTANA, fin)
+            ventanas.append((t, t_fin))
+            if t_fin >= fin:
+                break
+            t += SALTO
+
+    vectores = []
+    for ini, fin in ventanas:
+        frames = mel[:, int(ini * FRAMES_POR_SEGUNDO):max(int(fin * FRAMES_POR_SEGUNDO), int(ini * FRAMES_POR_SEGUNDO) + 1)]
+        vectores.append(np.concatenate([frames.mean(axis=1), frames.std(axis=1)]))
+
+    if not vectores:
+        return [], np.zeros((0, 2 * mel.shape[0]), dtype=np.float32)
+
+    vectores = np.array(vectores, dtype=np.float32)
+    # Quitar la media global deja solo lo que distingue a cada ventana
+    vectores -= vectores.mean(axis=0)
+    vectores /= np.linalg.norm(vectores, axis=1, keepdims=True) + 1e-9
+    return ventanas, vectores
+
+def _kmeans(vectores, k, iteraciones=30, semilla=0):
+    """k-means esférico con inicialización k-means++"""
+    rng = np.random.default_rng(semilla)
+    centros = [vectores[rng.integers(len(vectores))]]
+    for _ in range(1, k):
+        distancia = np.clip(1 - np.max(vectores @ np.array(centros).T, axis=1), 0, None)
+        total = distancia.sum()
+        centros.append(vectores[rng.choice(len(vectores), p=distancia / total if total > 0 else None)])
+    centros = np.array(centros)
+
+    for _ in range(iteraciones):
+        etiquetas = np.argmax(vectores @ centros.T, axis=1)
+        nuevos = np.array([
+            vectores[etiquetas == j].mean(axis=0) if np.any(etiquetas == j) else centros[j]
+            for j in range(k)
+        ])
+        nuevos /= np.linalg.norm(nuevos, axis=1, keepdims=True) + 1e-9
+        if np.allclose(nuevos, centros):
+            break
+        centros = nuevos
+    return etiquetas
+
+def _silueta(vectores, etiquetas):
+    """Silueta media con distancia coseno (0 si hay menos de dos grupos)"""
+    if len(set(etiquetas)) < 2:
+        return 0.0
+    distancias = 1 - vectores @ vectores.T
+    valores = []
+    for i, etiqueta in enumerate(etiquetas):
+        propios = etiquetas == etiqueta
+        if propios.sum() < 2:
+            valores.append(0.0)
+            continue
+        a = distancias[i, propios].sum() / (propios.sum() - 1)
+        b = min(distancias[i, etiquetas == otra].mean() for otra in set(etiquetas) if otra != etiqueta)
+        valores.append((b - a) / max(a, b, 1e-9))
+    return float(np.mean(valores))
+
+def agrupar(vectores, num_hablantes=None):
+    """Etiqueta cada vector con un hablante; estima cuántos hay si no se indica"""
+    if len(vectores) < 2 or num_hablantes == 1:
+        return np.zeros(len(vectores), dtype=int)
+    if num_hablantes:
+        return _kmeans(vectores, min(num_hablantes, len(vectores)))
+
+    # La silueta se evalúa sobre una muestra para acotar el coste en audios largos
+    rng = np.random.default_rng(0)
+    muestra = rng.choice(len(vectores), min(len(vectores), MUESTRA_SILUETA), replace=False)
+
+    mejor, mejor_silueta = None, SILUETA_MIN
+    for k in range(2, min(MAX_HABLANTES, len(vectores) - 1) + 1):
+        etiquetas = _kmeans(vectores, k)
+        silueta = _silueta(vectores[muestra], etiquetas[muestra])
+        if silueta > mejor_silueta:
+            mejor, mejor_silueta = etiquetas, silueta
+    return mejor if mejor is not None else np.zeros(len(vectores), dtype=int)
+
+def _suavizar(etiquetas):
+    """Corrige ventanas aisladas cuyo hablante difiere de ambos vecinos iguales"""
+    etiquetas = etiquetas.copy()
+    for i in range(1, len(etiquetas) - 1):
+        if etiquetas[i - 1] == etiquetas[i + 1] != etiquetas[i]:
+            etiquetas[i] = etiquetas[i - 1]
+    return etiquetas
+
+
+# ----------------------------------------------------------------------
+# Etapa de diarización
+# ----------------------------------------------------------------------
+
+class Diarizador:
+    """Ejecuta la diarización en un hilo mientras Whisper transcribe.
+
+    Uso:
+        diarizador = Diarizador(audio, regiones)
+        diarizador.iniciar()
+        result = model.transcribe(audio, ...)
+        segmentos = diarizador.etiquetar(result["segments"])
+    """
+
+    def __init__(self, audio, regiones, num_hablantes=None):
+        self.audio = audio
+        self.regiones = regiones
+        self.num_hablantes = num_hablantes
+        self.turnos = []
+        self._error = None
+        self._hilo = threading.Thread(target=self._ejecutar, daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def _ejecutar(self):
+        try:
+            ventanas, vectores = calcular_vectores(self.audio, self.regiones)
+            etiquetas = _suavizar(agrupar(vectores, self.num_hablantes))
+
+            # Numerar hablantes por orden de aparición
+            orden = {}
+            for etiqueta in etiquetas:
+                orden.setdefault(etiqueta, len(orden) + 1)
+            self.turnos = [(ini, fin, orden[e]) for (ini, fin), e in zip(ventanas, etiquetas)]
+        except Exception as e:
+            self._error = e
+
+    def etiquetar(self, segmentos):
+        """Espera a la diarización y añade la clave 'speaker' a cada segmento"""
+        self._hilo.join()
+        if self._error is not None:
+            raise self._error
+
+        if not self.turnos:
+            for segmento in segmentos:
+                segmento["speaker"] = 1
+            return segmentos
+
+        inicios, fines, hablantes = (np.array(c) for c in zip(*self.turnos))
+        centros = (inicios + fines) / 2
+        for segmento in segmentos:
+            solape = np.minimum(fines, segmento["end"]) - np.maximum(inicios, segmento["start"])
+            if np.any(solape > 0):
+                pesos = np.bincount(hablantes, weights=np.clip(solape, 0, None))
+                segmento["speaker"] = int(np.argmax(pesos))
+            else:
+                centro = (segmento["start"] + segmento["end"]) / 2
+                segmento["speaker"] = int(hablantes[np.argmin(np.abs(centros - centro))])
+        return segmentos
+
+
+# ----------------------------------------------------------------------
+# Salidas
+# ----------------------------------------------------------------------
+
+def nombre_hablante(numero):
+    return f"Hablante {numero}"
+
+def formatear_texto(segmentos):
+    """Texto con un párrafo por turno de palabra: '[Hablante N] ...'"""
+    parrafos = []
+    actual = None
+    for segmento in segmentos:
+        texto = segmento["text"].strip()
+        if not texto:
+            continue
+        if segmento.get("speaker") != actual:
+            actual = segmento.get("speaker")
+            parrafos.append(f"[{nombre_hablante(actual)}] {texto}")
+        else:
+            parrafos[-1] += " " + texto
+    return "\n\n".join(parrafos)
+
+def _tiempo_srt(segundos):
+    milisegundos = int(round(segundos * 1000))
+    horas, milisegundos = divmod(milisegundos, 3600000)
+    minutos, milisegundos = divmod(milisegundos, 60000)
+    segundos, milisegundos = divmod(milisegundos, 1000)
+    return f"{horas:02d}:{minutos:02d}:{segundos:02d},{milisegundos:03d}"
+
+def formatear_srt(segmentos):
+    """Subtítulos SRT con el hablante al inicio de cada línea"""
+    bloques = []
+    for i, segmento in enumerate(segmentos, 1):
+        texto = segmento["text"].strip()
+        if "speaker" in segmento:
+            texto = f"[{nombre_hablante(segmento['speaker'])}] {texto}"
+        bloques.append(f"{i}\n{_tiempo_srt(segmento['start'])} --> {_tiempo_srt(segmento['end'])}\n{texto}\n")
+    return "\n".join(bloques)
+
+def guardar_salidas(segmentos, base_path):
+    """Guarda <base>.srt y <base>.json con los segmentos etiquetados"""
+    with open(base_path + ".srt", "w", encoding="utf-8") as f:
+        f.write(formatear_srt(segmentos))
+
+    datos = [
+        {
+            "start": round(s["start"], 2),
+            "end": round(s["end"], 2),
+            "speaker": nombre_hablante(s["speaker"]) if "speaker" in s else None,
+            "text": s["text"].strip(),
+        }
+        for s in segmentos
+    ]
+    with open(base_path + ".json", "w", encoding="utf-8") as f:
+        json.dump({"segments": datos}, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    """Compara el tiempo de la transcripción sola y con diarización en paralelo"""
+    parser = argparse.ArgumentParser(description="Mide el coste de la diarización sobre la transcripción")
+    parser.add_argument("audio", help="Archivo de audio")
+    parser.add_argument("--modelo", default="base", help="Modelo de Whisper")
+    parser.add_argument("--idioma", default="es", help="Código de idioma (vacío para detectar)")
+    args = parser.parse_args()
+
+    from transcriptor import setup_ffmpeg, get_models_dir
+    setup_ffmpeg()
+
+    import whisper
+
+    model = whisper.load_model(args.modelo, download_root=get_models_dir(args.modelo))
+    audio = whisper.load_audio(args.audio)
+    opciones = {"language": args.idioma or None, "fp16": False, "verbose": None}
+    print(f"Audio: {len(audio) / SAMPLE_RATE:.1f} s, modelo '{args.modelo}'")
+
+    inicio = time.perf_counter()
+    model.transcribe(audio, **opciones)
+    solo_asr = time.perf_counter() - inicio
+    print(f"Transcripción sola:           {solo_asr:.1f} s")
+
+    inicio = time.perf_counter()
+    regiones = detectar_voz(audio)
+    diarizador = Diarizador(audio, regiones).iniciar()
+    result = model.transcribe(audio, **opciones)
+    segmentos = diarizador.etiquetar(result["segments"])
+    con_diarizacion = time.perf_counter() - inicio
+    print(f"Transcripción + diarización:  {con_diarizacion:.1f} s "
+          f"({(con_diarizacion / solo_asr - 1) * 100:+.0f}%)")
+
+    inicio = time.perf_counter()
+    Diarizador(audio, regiones).iniciar().etiquetar([])
+    print(f"Diarización sola:             {time.perf_counter() - inicio:.1f} s")
+    print(f"Hablantes detectados:         {len({s['speaker'] for s in segmentos}) if segmentos else 0}")
+
+if __name__ == "__main__":
+    main()
@@ -1,117 +1,412 @@
 #!/usr/bin/env python3
 """
 Script para descargar FFmpeg automáticamente en Windows
+
+- Descarga por segmentos en paralelo (peticiones Range) y se puede reanudar
+  si se interrumpe: basta con volver a ejecutarlo.
+- Extrae solo los ejecutables necesarios, en streaming y con buffers acotados.
+- Verifica el ZIP y los ejecutables con un manifiesto SHA-256.
+
+Uso:
+    python download_ffmpeg.py
+    python download_ffmpeg.py --mirror http://servidor-local/ffmpeg
+    python download_ffmpeg.py --archivo ffmpeg-master-latest-win64-gpl.zip --manifest SHA256SUMS.txt
 """
 
 import os
 import sys
+import json
+import hashlib
 import zipfile
-import shutil
+import argparse
+import threading
+import urllib.error
 import urllib.request
 from pathlib import Path
 
 # URL de FFmpeg (build estable de BtbN)
-FFMPEG_URL = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-win64-gpl.zip"
+FFMPEG_RELEASE_URL = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest"
 FFMPEG_FILENAME = "ffmpeg-master-latest-win64-gpl.zip"
+FFMPEG_URL = f"{FFMPEG_RELEASE_URL}/{FFMPEG_FILENAME}"
+
+# BtbN publica los SHA-256 de cada ZIP junto a la release
+CHECKSUMS_FILENAME = "checksums.sha256"
+
+# Ejecutables que se extraen del ZIP
+BINARIOS = ("ffmpeg.exe", "ffprobe.exe", "ffplay.exe")
+
+SEGMENTOS = 4
+CHUNK_SIZE = 1024 * 1024  # 1 MB por lectura/escritura
 
-def download_progress(count, block_size, total_size):
+def mostrar_progreso(descargado, total):
     """Muestra el progreso de descarga"""
-    percent = int(count * block_size * 100 / total_size)
-    percent = min(percent, 100)
+    percent = min(int(descargado * 100 / total), 100) if total else 0
     bar_length = 50
     filled_length = int(bar_length * percent // 100)
     bar = '█' * filled_length + '░' * (bar_length - filled_length)
     print(f'\rDescargando: |{bar}| {percent}%', end='', flush=True)
 
-def download_ffmpeg():
-    """Descarga FFmpeg desde GitHub"""
+def calcular_sha256(path):
+    """Calcula el SHA-256 de un archivo leyéndolo por bloques"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def leer_manifest(origen):
+    """Lee un manifiesto "sha256  nombre" desde una ruta local o una URL"""
+    if os.path.exists(origen):
+        with open(origen, 'r', encoding='utf-8') as f:
+            contenido = f.read()
+    else:
+        with urllib.request.urlopen(origen, timeout=30) as response:
+            contenido = response.read().decode('utf-8')
+
+    manifest = {}
+    for linea in contenido.splitlines():
+        partes = linea.split()
+        if len(partes) >= 2:
+            # Se indexa por nombre de archivo sin ruta ni '*' de modo binario
+            manifest[Path(partes[-1].lstrip('*')).name] = partes[0].lower()
+    return manifest
+
+
+# ----------------------------------------------------------------------
+# Descarga
+# ----------------------------------------------------------------------
+
+class RangoNoAdmitido(Exception):
+    """El servidor respondió a una petición Range con otra cosa que el rango pedido"""
+
+
+def consultar_servidor(url):
+    """Devuelve (tamaño, admite_rangos) del recurso remoto.
+
+    Algunos servidores rechazan HEAD; en ese caso se pide el primer byte con
+    un GET y se deduce todo de la respuesta.
+    """
+    try:
+        request = urllib.request.Request(url, method='HEAD')
+        with urllib.request.urlopen(request, timeout=30) as response:
+            size = int(response.headers.get('Content-Length') or 0)
+            ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        return size, ranges
+    except urllib.error.HTTPError:
+        pass
+
+    request = urllib.request.Request(url, headers={'Range': 'bytes=0-0'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        if response.status == 206:
+            # Content-Range: bytes 0-0/<tamaño>
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            return (int(total), True) if total.isdigit() else (0, False)
+        return int(response.headers.get('Content-Length') or 0), False
+
+def _comprobar_rango(response, inicio, fin):
+    """Lanza RangoNoAdmitido si la respuesta no es exactamente bytes inicio-fin"""
+    content_range = response.headers.get('Content-Range', '')
+    if response.status != 206 or not content_range.startswith(f'bytes {inicio}-{fin}/'):
+        raise RangoNoAdmitido(f"respuesta {response.status} '{content_range}' a bytes={inicio}-{fin}")
+
+def _planificar_segmentos(size, segmentos):
+    """Divide [0, size) en segmentos [inicio, fin, descargado]"""
+    step = -(-size // segmentos)
+    return [[inicio, min(inicio + step, size) - 1, 0] for inicio in range(0, size, step)]
+
+def _estado_valido(estado, url, size, part_path):
+    """Comprueba que un estado guardado describe una descarga reanudable de url"""
+    try:
+        if estado.get('url') != url or estado.get('size') != size or not size:
+            return False
+        if part_path.stat().st_size != size:
+            return False
+        siguiente = 0
+        for inicio, fin, hecho in estado['segmentos']:
+            # Segmentos contiguos que cubren [0, size) y progreso dentro de cada uno
+            if inicio != siguiente or fin < inicio or not 0 <= hecho <= fin - inicio + 1:
+                return False
+            siguiente = fin + 1
+        return siguiente == size
+    except (AttributeError, KeyError, TypeError, ValueError, OSError):
+        return False
+
+def descargar(url, destino, segmentos=SEGMENTOS):
+    """Descarga url en destino por segmentos paralelos, reanudando si es posible.
+
+    Mientras dura la descarga se usan destino.part (datos) y destino.part.json
+    (progreso de cada segmento). Si el servidor no admite rangos, o responde
+    a una petición Range sin el rango pedido, se descarga en un único flujo.
+    """
+    destino = Path(destino)
+    part_path = destino.with_name(destino.name + '.part')
+    state_path = destino.with_name(destino.name + '.part.json')
+
+    size, ranges = consultar_servidor(url)
+    try:
+        return _descargar(url, destino, part_path, state_path, size, ranges, segmentos)
+    except RangoNoAdmitido as e:
+        print(f"\n⚠️ El servidor no respeta los rangos ({e}); descargando en un único flujo...")
+        for path in (part_path, state_path):
+            if path.exists():
+                os.remove(path)
+        return _descargar(url, destino, part_path, state_path, size, False, 1)
+
+def _descargar(url, destino, part_path, state_path, size, ranges, segmentos):
+    if not size or not ranges:
+        segmentos = 1
+
+    # Reanudar solo si la descarga anterior era del mismo recurso y es coherente
+    estado = None
+    if ranges and state_path.exists() and part_path.exists():
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            estado = None
+        if estado is not None and not _estado_valido(estado, url, size, part_path):
+            print("⚠️ Estado de descarga anterior no válido; empezando de nuevo")
+            estado = None
+
+    if estado is None:
+        estado = {'url': url, 'size': size, 'segmentos': _planificar_segmentos(size, segmentos) if size else [[0, -1, 0]]}
+        with open(part_path, 'wb') as f:
+            if size:
+                f.truncate(size)
+    else:
+        print("Reanudando descarga anterior...")
+
+    lock = threading.Lock()
+    errores = []
+    cancelado = threading.Event()
+    descargado = [sum(s[2] for s in estado['segmentos'])]
+
+    def guardar_estado():
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+
+    def descargar_segmento(segmento):
+        inicio, fin, hecho = segmento
+        if fin >= 0 and inicio + hecho > fin:
+            return
+        request = urllib.request.Request(url)
+        con_rango = fin >= 0 and ranges
+        if con_rango:
+            request.add_header('Range', f'bytes={inicio + hecho}-{fin}')
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response, \
+                    open(part_path, 'r+b') as target:
+                if con_rango:
+                    _comprobar_rango(response, inicio + hecho, fin)
+                target.seek(inicio + hecho)
+                while not cancelado.is_set():
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    # Los datos deben estar en disco antes de anotarlos en el estado
+                    target.flush()
+                    with lock:
+                        segmento[2] += len(chunk)
+                        descargado[0] += len(chunk)
+                        guardar_estado()
+                        mostrar_progreso(descargado[0], size)
+        except Exception as e:
+            with lock:
+                errores.append(e)
+            if isinstance(e, RangoNoAdmitido):
+                # El resto de segmentos se descartará: no tiene sentido seguir
+                cancelado.set()
+
+    guardar_estado()
+    hilos = [threading.Thread(target=descargar_segmento, args=(s,), daemon=True) for s in estado['segmentos']]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    for error in errores:
+        if isinstance(error, RangoNoAdmitido):
+            raise error
+    if errores:
+        raise RuntimeError(f"{errores[0]} (vuelve a ejecutar el script para reanudar)")
+    if size and descargado[0] != size:
+        raise RuntimeError(f"Descarga incompleta: {descargado[0]} de {size} bytes")
+
+    os.replace(part_path, destino)
+    os.remove(state_path)
+    return destino
+
+
+# ----------------------------------------------------------------------
+# Extracción
+# ----------------------------------------------------------------------
+
+def extraer_binarios(zip_path, ffmpeg_dir, manifest=None):
+    """Extrae los ejecutables de bin/ en streaming y verifica su SHA-256.
+
+    Cada archivo se escribe primero como .tmp y solo se renombra si el
+    checksum coincide con el manifiesto (cuando éste lo incluye).
+    """
+    manifest = manifest or {}
+    extraidos = {}
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            filename = Path(info.filename).name
+            if '/bin/' not in info.filename or filename not in BINARIOS:
+                continue
+
+            print(f"  Extrayendo: {filename}")
+            target_path = ffmpeg_dir / filename
+            tmp_path = ffmpeg_dir / (filename + '.tmp')
+            sha = hashlib.sha256()
+
+            with zip_ref.open(info) as source, open(tmp_path, 'wb') as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    sha.update(chunk)
+                    target.write(chunk)
+
+            digest = sha.hexdigest()
+            esperado = manifest.get(filename)
+            if esperado and esperado != digest:
+                os.remove(tmp_path)
+                raise RuntimeError(f"Checksum incorrecto para {filename}")
+
+            os.replace(tmp_path, target_path)
+            extraidos[filename] = digest
+
+    return extraidos
+
+
+def download_ffmpeg(args):
+    """Descarga FFmpeg desde GitHub o desde un mirror/archivo local"""
     print("=" * 50)
     print("  Descargador de FFmpeg para Whisper Transcriptor")
     print("=" * 50)
     print()
-    
-    if sys.platform != "win32":
+
+    origen_explicito = args.url or args.mirror or args.archivo
+    if sys.platform != "win32" and not origen_explicito:
         print("Este script está diseñado para Windows.")
         print("En Linux/Mac, instala FFmpeg con tu gestor de paquetes:")
         print("  - Ubuntu/Debian: sudo apt install ffmpeg")
         print("  - Mac: brew install ffmpeg")
-        return
-    
-    ffmpeg_dir = Path("ffmpeg")
+        return False
+
+    ffmpeg_dir = Path(args.destino)
     ffmpeg_exe = ffmpeg_dir / "ffmpeg.exe"
-    
+
     # Verificar si ya existe
-    if ffmpeg_exe.exists():
+    if ffmpeg_exe.exists() and not args.si:
         print(f"✅ FFmpeg ya está instalado en: {ffmpeg_dir.absolute()}")
         response = input("\n¿Deseas reinstalar? (s/n): ").lower().strip()
         if response != 's':
             print("Cancelado.")
-            return
-    
+            return True
+
     # Crear carpeta si no existe
     ffmpeg_dir.mkdir(exist_ok=True)
-    
+
+    # Resolver origen del ZIP y del manifiesto
+    base_url = args.mirror.rstrip('/') if args.mirror else FFMPEG_RELEASE_URL
+    url = args.url or f"{base_url}/{FFMPEG_FILENAME}"
+    manifest_origen = args.manifest or (None if args.archivo else f"{base_url}/{CHECKSUMS_FILENAME}")
+
+    manifest = {}
+    if manifest_origen:
+        try:
+            manifest = leer_manifest(manifest_origen)
+        except Exception as e:
+            if args.manifest:
+                print(f"❌ No se pudo leer el manifiesto: {e}")
+                return False
+            print(f"⚠️ No se pudo obtener {CHECKSUMS_FILENAME}: {e}")
+
     # Descargar
-    print(f"\nDescargando FFmpeg desde GitHub...")
-    print(f"URL: {FFMPEG_URL}")
-    print()
-    
-    try:
-        urllib.request.urlretrieve(FFMPEG_URL, FFMPEG_FILENAME, download_progress)
-        print("\n✅ Descarga completada!")
-    except Exception as e:
-        print(f"\n❌ Error al descargar: {e}")
-        print("\nDescarga manualmente desde:")
-        print(f"  {FFMPEG_URL}")
-        return
-    
+    if args.archivo:
+        zip_path = Path(args.archivo)
+        borrar_zip = False
+        print(f"Usando archivo local: {zip_path}")
+    else:
+        zip_path = Path(Path(url).name or FFMPEG_FILENAME)
+        borrar_zip = True
+        print(f"\nDescargando FFmpeg...")
+        print(f"URL: {url}")
+        print()
+
+        try:
+            descargar(url, zip_path, args.segmentos)
+            print("\n✅ Descarga completada!")
+        except Exception as e:
+            print(f"\n❌ Error al descargar: {e}")
+            print("\nDescarga manualmente desde:")
+            print(f"  {url}")
+            return False
+
+    # Verificar el ZIP si el manifiesto lo incluye
+    esperado = manifest.get(zip_path.name)
+    if esperado:
+        print("\nVerificando checksum del ZIP...")
+        if calcular_sha256(zip_path) != esperado:
+            print("❌ Checksum incorrecto: el archivo está dañado o fue modificado")
+            if borrar_zip:
+                os.remove(zip_path)
+            return False
+        print("✅ Checksum correcto")
+    elif args.manifest:
+        print(f"⚠️ El manifiesto no incluye {zip_path.name}; solo se verificarán los ejecutables")
+
     # Extraer
     print("\nExtrayendo archivos...")
     try:
-        with zipfile.ZipFile(FFMPEG_FILENAME, 'r') as zip_ref:
-            # Encontrar la carpeta bin dentro del ZIP
-            for member in zip_ref.namelist():
-                if '/bin/' in member and member.endswith('.exe'):
-                    # Extraer solo el nombre del archivo
-                    filename = Path(member).name
-                    print(f"  Extrayendo: {filename}")
-                    
-                    # Leer el archivo del ZIP
-                    with zip_ref.open(member) as source:
-                        target_path = ffmpeg_dir / filename
-                        with open(target_path, 'wb') as target:
-                            target.write(source.read())
-        
+        extraidos = extraer_binarios(zip_path, ffmpeg_dir, manifest)
         print("✅ Extracción completada!")
-        
     except Exception as e:
         print(f"❌ Error al extraer: {e}")
-        return
-    
+        return False
+
     # Limpiar archivo ZIP
-    print("\nLimpiando archivos temporales...")
-    try:
-        os.remove(FFMPEG_FILENAME)
-    except:
-        pass
-    
+    if borrar_zip:
+        print("\nLimpiando archivos temporales...")
+        try:
+            os.remove(zip_path)
+        except OSError:
+            pass
+
     # Verificar instalación
     print("\nVerificando instalación...")
-    files_found = list(ffmpeg_dir.glob("*.exe"))
-    
-    if files_found:
+    if extraidos:
         print("\n✅ FFmpeg instalado correctamente!")
         print(f"\nArchivos en {ffmpeg_dir.absolute()}:")
-        for f in files_found:
-            size_mb = f.stat().st_size / (1024 * 1024)
-            print(f"  - {f.name} ({size_mb:.1f} MB)")
+        for filename, digest in extraidos.items():
+            size_mb = (ffmpeg_dir / filename).stat().st_size / (1024 * 1024)
+            print(f"  - {filename} ({size_mb:.1f} MB) sha256={digest[:16]}...")
     else:
         print("❌ No se encontraron archivos ejecutables")
-    
+        return False
+
     print("\n" + "=" * 50)
     print("  ¡Listo! Ya puedes usar Whisper Transcriptor")
     print("=" * 50)
+    return True
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Descarga FFmpeg para Whisper Transcriptor")
+    parser.add_argument("--url", help="URL completa del ZIP de FFmpeg")
+    parser.add_argument("--mirror", help=f"URL base que contiene {FFMPEG_FILENAME} y {CHECKSUMS_FILENAME}")
+    parser.add_argument("--archivo", help="Usar un ZIP ya descargado en lugar de descargarlo")
+    parser.add_argument("--manifest", help="Ruta o URL de un manifiesto SHA-256 (formato sha256sum)")
+    parser.add_argument("--destino", default="ffmpeg", help="Carpeta donde instalar los ejecutables")
+    parser.add_argument("--segmentos", type=int, default=SEGMENTOS, help="Conexiones en paralelo")
+    parser.add_argument("--si", action="store_true", help="No preguntar (reinstalar y salir sin pausa)")
+    args = parser.parse_args()
+
+    ok = download_ffmpeg(args)
+    if not args.si:
+        input("\nPresiona Enter para salir...")
+    sys.exit(0 if ok else 1)
 
 if __name__ == "__main__":
-    download_ffmpeg()
-    input("\nPresiona Enter para salir...")
+    main()
@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""
+Whisper Transcriptor - Planificador de trabajos
+Ordena las transcripciones que compiten por la misma CPU, también entre
+procesos: la interfaz y los lotes lanzados desde la línea de comandos
+comparten una cola en la carpeta temporal del sistema.
+
+- Clases de prioridad: los trabajos interactivos (interfaz) pasan delante
+  de los lotes en segundo plano.
+- Reparto justo: dentro de una misma prioridad empieza primero el origen
+  que lleva más tiempo sin turno, para que un lote grande no bloquee a los demás.
+- Admisión: un trabajo solo empieza si hay hueco (max_trabajos, contando
+  los de todos los procesos) y la memoria estimada de su modelo cabe en el
+  presupuesto junto con los que ya se ejecutan.
+- ETA: duración del audio (ffprobe) por el factor de tiempo real medido
+  de cada modelo, compartido entre procesos.
+
+Estado compartido (carpeta whisper_transcriptor_cola de la carpeta temporal
+del usuario; en Linux y macOS, whisper_transcriptor_cola_<uid> con permisos
+solo para el usuario). Si no se puede usar, la cola funciona solo dentro
+del proceso:
+    esperando/<pid>_<id>.json     trabajos en cola
+    en_ejecucion/<pid>_<id>.json  trabajos en curso
+    turnos.json                   último inicio de cada origen
+    rtf.json                      factor de tiempo real por modelo
+Cada proceso reescribe sus entradas periódicamente; las que dejan de
+actualizarse (proceso terminado de golpe) caducan y se borran.
+
+Uso (lote en segundo plano):
+    python planificador.py audio1.mp3 audio2.mp3 --modelo small --metricas metricas.json
+"""
+
+import argparse
+import atexit
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# Clases de prioridad (menor valor = más prioridad)
+INTERACTIVA = 0
+NORMAL = 1
+LOTE = 2
+
+NOMBRES_PRIORIDAD = {INTERACTIVA: "interactiva", NORMAL: "normal", LOTE: "lote"}
+
+# Memoria aproximada por modelo en MB (ver tabla de modelos del README)
+MEMORIA_MODELO_MB = {
+    "tiny": 1024,
+    "base": 1024,
+    "small": 2048,
+    "medium": 5120,
+    "large": 10240,
+}
+
+# Factor de tiempo real inicial en CPU; se ajusta con cada trabajo terminado
+RTF_INICIAL = {
+    "tiny": 0.1,
+    "base": 0.2,
+    "small": 0.6,
+    "medium": 1.5,
+    "large": 3.0,
+}
+
+# Peso de la última medición en la media móvil del factor de tiempo real
+PESO_RTF = 0.3
+
+# Cola compartida entre procesos
+# En Windows la carpeta temporal ya es de cada usuario; en Linux y macOS /tmp es común
+DIRECTORIO_COLA = os.path.join(
+    tempfile.gettempdir(),
+    "whisper_transcriptor_cola" if os.name == "nt" else f"whisper_transcriptor_cola_{os.getuid()}",
+)
+SONDEO = 0.5       # segundos entre intentos mientras hay trabajos propios en cola
+LATIDO = 5.0       # segundos entre renovaciones de las entradas propias
+CADUCIDAD = 30.0   # una entrada sin renovar durante este tiempo es de un proceso muerto
+
+
+def probar_duracion(audio_path):
+    """Devuelve la duración del audio en segundos usando ffprobe, o None"""
+    ffmpeg = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+    ffprobe = os.path.join(os.path.dirname(ffmpeg), os.path.basename(ffmpeg).replace("ffmpeg", "ffprobe"))
+    try:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
+            capture_output=True, text=True, timeout=30,
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def memoria_disponible_mb():
+    """Presupuesto de memoria por defecto: 75% de la RAM total si se conoce"""
+    try:
+        import psutil
+        return psutil.virtual_memory().total / (1024 * 1024) * 0.75
+    except ImportError:
+        return 8192
+
+
+# ----------------------------------------------------------------------
+# Estado compartido en disco
+# ----------------------------------------------------------------------
+
+@contextmanager
+def bloqueo_archivo(path):
+    """Bloqueo exclusivo entre procesos; el sistema lo libera si el proceso muere"""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK reintenta durante ~10 s antes de fallar
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _leer_json(path, defecto):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return defecto
+
+
+def _escribir_json(path, datos):
+    """Escribe de forma atómica: nadie ve nunca un archivo a medias"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    os.replace(tmp, path)
+
+
+def _borrar(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _leer_entradas(carpeta):
+    """Entradas vigentes de una carpeta; borra las caducadas"""
+    entradas = []
+    ahora = time.time()
+    for nombre in os.listdir(carpeta):
+        if not nombre.endswith(".json"):
+            continue
+        path = os.path.join(carpeta, nombre)
+        try:
+            caducada = ahora - os.path.getmtime(path) > CADUCIDAD
+        except OSError:
+            continue
+        if caducada:
+            _borrar(path)
+            continue
+        entrada = _leer_json(path, None)
+        # Entradas de otra versión o a medio escribir por otra herramienta se ignoran
+        if _entrada_valida(entrada):
+            entradas.append(entrada)
+    return entradas
+
+
+def _es_numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _entrada_valida(entrada):
+    """Comprueba que una entrada de la cola tiene todos los campos con su tipo"""
+    if not isinstance(entrada, dict):
+        return False
+    return (
+        isinstance(entrada.get("clave"), str)
+        and isinstance(entrada.get("prioridad"), int) and not isinstance(entrada.get("prioridad"), bool)
+        and isinstance(entrada.get("origen"), str)
+        and isinstance(entrada.get("modelo"), str)
+        and _es_numero(entrada.get("memoria_mb"))
+        and _es_numero(entrada.get("enviado"))
+        and (entrada.get("duracion") is None or _es_numero(entrada.get("duracion")))
+        and (entrada.get("iniciado") is None or _es_numero(entrada.get("iniciado")))
+    )
+
+
+def _leer_numeros(path):
+    """Lee un JSON {nombre: número} descartando lo que no encaje"""
+    datos = _leer_json(path, {})
+    if not isinstance(datos, dict):
+        return {}
+    return {k: v for k, v in datos.items() if _es_numero(v)}
+
+
+class Trabajo:
+    """Un trabajo de transcripción en el planificador"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, funcion, audio_path, modelo, prioridad, origen):
+        self.id = next(self._ids)
+        self.clave = f"{os.getpid()}_{self.id}"
+        self.funcion = funcion
+        self.audio_path = audio_path
+        self.modelo = modelo
+        self.prioridad = prioridad
+        self.origen = origen
+        self.future = Future()
+        # Se resuelve con la ETA (o None) cuando se conoce la duración del audio
+        self.estimacion = Future()
+
+        self.duracion = None
+        self.enviado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self.eta = None
+        self.segundos_proceso = None
+
+    @property
+    def memoria_mb(self):
+        return MEMORIA_MODELO_MB.get(self.modelo, MEMORIA_MODELO_MB["large"])
+
+    def result(self, timeout=None):
+        """Espera al resultado de la función del trabajo"""
+        return self.future.result(timeout)
+
+    @contextmanager
+    def medir(self):
+        """Cronometra la parte que cuenta para el factor de tiempo real.
+
+        La función del trabajo debe envolver solo la transcripción, sin la
+        carga o descarga del modelo:
+
+            with trabajo.medir():
+                result = model.transcribe(...)
+        """
+        inicio = time.perf_counter()
+        yield
+        self.segundos_proceso = (self.segundos_proceso or 0.0) + time.perf_counter() - inicio
+
+
+class Planificador:
+    """Cola de transcripciones con prioridades, reparto justo y admisión por memoria.
+
+    Args:
+        max_trabajos: trabajos que pueden ejecutarse a la vez, contando los
+            de todos los procesos
+        memoria_mb: presupuesto de memoria para los modelos en ejecución
+        directorio: carpeta de la cola compartida
+    """
+
+    def __init__(self, max_trabajos=1, memoria_mb=None, directorio=DIRECTORIO_COLA):
+        self.max_trabajos = max_trabajos
+        self.memoria_mb = memoria_mb if memoria_mb is not None else memoria_disponible_mb()
+
+        try:
+            self._preparar_directorio(directorio)
+        except OSError as e:
+            # Carpeta de otro usuario o sin permisos: cola solo para este proceso
+            privado = tempfile.mkdtemp(prefix="whisper_transcriptor_cola_")
+            print(f"⚠️ No se puede usar la cola compartida en {directorio} ({e}); "
+                  f"los trabajos se coordinan solo dentro de este proceso", file=sys.stderr)
+            self._preparar_directorio(privado)
+
+        # Orden de bloqueo: siempre el global (archivo) antes que el local
+        self._lock = threading.Condition()
+        self._pendientes = {}      # clave -> Trabajo en cola de este planificador
+        self._en_ejecucion = {}    # clave -> Trabajo en curso de este planificador
+        self._rtf = dict(RTF_INICIAL)
+
+        self._esperas = []
+        self._errores_eta = []
+
+        for _ in range(max_trabajos):
+            threading.Thread(target=self._trabajador, daemon=True).start()
+        threading.Thread(target=self._latir, daemon=True).start()
+        atexit.register(self._limpiar)
+
+    # ------------------------------------------------------------------
+    # Estado compartido
+    # ------------------------------------------------------------------
+
+    def _preparar_directorio(self, directorio):
+        """Fija las rutas del estado compartido y comprueba que se puede escribir"""
+        self._dir_esperando = os.path.join(directorio, "esperando")
+        self._dir_en_ejecucion = os.path.join(directorio, "en_ejecucion")
+        self._path_turnos = os.path.join(directorio, "turnos.json")
+        self._path_rtf = os.path.join(directorio, "rtf.json")
+        self._path_bloqueo = os.path.join(directorio, "cola.lock")
+        os.makedirs(directorio, mode=0o700, exist_ok=True)
+        if os.name != "nt" and os.stat(directorio).st_uid != os.getuid():
+            raise PermissionError(f"la carpeta pertenece a otro usuario: {directorio}")
+        os.makedirs(self._dir_esperando, mode=0o700, exist_ok=True)
+        os.makedirs(self._dir_en_ejecucion, mode=0o700, exist_ok=True)
+        with self._bloqueo_global():
+            prueba = os.path.join(self._dir_esperando, f"prueba_{os.getpid()}.tmp")
+            _escribir_json(prueba, {})
+            _borrar(prueba)
+
+    def _bloqueo_global(self):
+        return bloqueo_archivo(self._path_bloqueo)
+
+    def _path_entrada(self, trabajo):
+        carpeta = self._dir_esperando if trabajo.iniciado is None else self._dir_en_ejecucion
+        return os.path.join(carpeta, trabajo.clave + ".json")
+
+    def _publicar(self, trabajo):
+        """Escribe (o renueva) la entrada compartida del trabajo"""
+        _escribir_json(self._path_entrada(trabajo), {
+            "clave": trabajo.clave,
+            "prioridad": trabajo.prioridad,
+            "origen": trabajo.origen,
+            "modelo": trabajo.modelo,
+            "memoria_mb": trabajo.memoria_mb,
+            "duracion": trabajo.duracion,
+            "enviado": trabajo.enviado,
+            "iniciado": trabajo.iniciado,
+        })
+
+    def _leer_estado(self):
+        """Devuelve (esperando en orden de ejecución, en ejecución); requiere el bloqueo global"""
+        turnos = _leer_numeros(self._path_turnos)
+        self._rtf.update(_leer_numeros(self._path_rtf))
+        esperando = _leer_entradas(self._dir_esperando)
+        # Prioridad, luego el origen que lleva más tiempo sin turno, luego llegada
+        esperando.sort(key=lambda e: (e["prioridad"], turnos.get(e["origen"], 0.0), e["enviado"], e["clave"]))
+        return esperando, _leer_entradas(self._dir_en_ejecucion)
+
+    def _latir(self):
+        """Renueva las entradas propias para que los demás procesos no las den por muertas"""
+        while True:
+            time.sleep(LATIDO)
+            try:
+                with self._bloqueo_global():
+                    with self._lock:
+                        trabajos = list(self._pendientes.values()) + list(self._en_ejecucion.values())
+                    for trabajo in trabajos:
+                        self._publicar(trabajo)
+            except Exception:
+                pass  # se reintenta en el siguiente latido
+
+    def _limpiar(self):
+        """Borra las entradas propias al salir"""
+        with self._lock:
+            trabajos = list(self._pendientes.values()) + list(self._en_ejecucion.values())
+        for trabajo in trabajos:
+            _borrar(self._path_entrada(trabajo))
+
+    # ------------------------------------------------------------------
+    # Envío y selección
+    # ------------------------------------------------------------------
+
+    def enviar(self, funcion, audio_path, modelo, prioridad=NORMAL, origen="script"):
+        """Encola funcion(trabajo) y devuelve el Trabajo sin esperar.
+
+        La duración del audio se mide en segundo plano; trabajo.estimacion
+        se resuelve con la ETA cuando está disponible.
+        """
+        trabajo = Trabajo(funcion, audio_path, modelo, prioridad, origen)
+        with self._lock:
+            self._pendientes[trabajo.clave] = trabajo
+        with self._bloqueo_global():
+            self._publicar(trabajo)
+        with self._lock:
+            self._lock.notify_all()
+
+        threading.Thread(target=self._estimar, args=(trabajo,), daemon=True).start()
+        return trabajo
+
+    def _estimar(self, trabajo):
+        """Mide la duración del audio y calcula la ETA inicial"""
+        eta = None
+        try:
+            duracion = probar_duracion(trabajo.audio_path)
+            with self._bloqueo_global():
+                with self._lock:
+                    trabajo.duracion = duracion
+                    publicar = trabajo.clave in self._pendientes or trabajo.clave in self._en_ejecucion
+                if publicar:
+                    self._publicar(trabajo)
+                eta = self._eta(trabajo, *self._leer_estado())
+        except Exception:
+            pass  # sin ETA; el trabajo sigue en cola
+        trabajo.eta = eta
+        trabajo.estimacion.set_result(eta)
+
+    def _reclamar(self):
+        """Saca de la cola compartida el próximo trabajo si es de este planificador y es admisible"""
+        with self._bloqueo_global():
+            esperando, en_ejecucion = self._leer_estado()
+            if not esperando:
+                return None
+
+            # Solo empieza la cabeza de la cola global: si es de otro proceso, se le espera
+            with self._lock:
+                trabajo = self._pendientes.get(esperando[0]["clave"])
+            if trabajo is None:
+                return None
+
+            if en_ejecucion:
+                if len(en_ejecucion) >= self.max_trabajos:
+                    return None
+                # Un modelo mayor que todo el presupuesto se admite si va solo
+                en_uso = sum(e["memoria_mb"] for e in en_ejecucion)
+                if en_uso + trabajo.memoria_mb > self.memoria_mb:
+                    return None
+
+            _borrar(self._path_entrada(trabajo))
+            with self._lock:
+                del self._pendientes[trabajo.clave]
+                trabajo.iniciado = time.time()
+                self._en_ejecucion[trabajo.clave] = trabajo
+                self._esperas.append(trabajo.iniciado - trabajo.enviado)
+
+            # A partir de aquí el trabajo se ejecuta aunque falle el estado compartido
+            try:
+                self._publicar(trabajo)
+                turnos = _leer_numeros(self._path_turnos)
+                turnos[trabajo.origen] = trabajo.iniciado
+                _escribir_json(self._path_turnos, turnos)
+            except OSError:
+                pass
+            return trabajo
+
+    def _trabajador(self):
+        while True:
+            with self._lock:
+                while not self._pendientes:
+                    self._lock.wait()
+
+            try:
+                trabajo = self._reclamar()
+            except Exception:
+                # Un fallo del estado compartido no puede acabar con el trabajador
+                trabajo = None
+            if trabajo is None:
+                # La cabeza es de otro proceso o no cabe todavía: volver a mirar en un rato
+                with self._lock:
+                    self._lock.wait(SONDEO)
+                continue
+
+            resultado = error = None
+            try:
+                resultado = trabajo.funcion(trabajo)
+            except Exception as e:
+                error = e
+
+            # Métricas actualizadas antes de despertar a quien espera el resultado
+            with self._lock:
+                trabajo.terminado = time.time()
+                del self._en_ejecucion[trabajo.clave]
+            try:
+                with self._bloqueo_global():
+                    _borrar(self._path_entrada(trabajo))
+                    if error is None:
+                        self._registrar_fin(trabajo)
+            except Exception:
+                pass  # la entrada caducará sola
+            with self._lock:
+                self._lock.notify_all()
+
+            if error is None:
+                trabajo.future.set_result(resultado)
+            else:
+                trabajo.future.set_exception(error)
+
+    # ------------------------------------------------------------------
+    # Estimaciones
+    # ------------------------------------------------------------------
+
+    def _estimar_duracion(self, modelo, duracion):
+        """Segundos de proceso estimados para un audio"""
+        if duracion is None:
+            return None
+        return duracion * self._rtf.get(modelo, RTF_INICIAL["large"])
+
+    def _estimar_eta(self, trabajo, esperando, en_ejecucion):
+        """Instante estimado de finalización de un trabajo en cola"""
+        ahora = time.time()
+        # Tiempo restante de lo que se está ejecutando, repartido entre los trabajadores
+        ocupado = 0.0
+        for e in en_ejecucion:
+            estimado = self._estimar_duracion(e["modelo"], e["duracion"]) or 0.0
+            ocupado += max(0.0, estimado - (ahora - e["iniciado"]))
+
+        for e in esperando:
+            estimado = self._estimar_duracion(e["modelo"], e["duracion"])
+            if estimado is None:
+                return None
+            if e["clave"] == trabajo.clave:
+                return ahora + ocupado / self.max_trabajos + estimado
+            ocupado += estimado
+        return None
+
+    def _eta(self, trabajo, esperando, en_ejecucion):
+        if trabajo.terminado:
+            return trabajo.terminado
+        if trabajo.iniciado:
+            estimado = self._estimar_duracion(trabajo.modelo, trabajo.duracion)
+            return trabajo.iniciado + estimado if estimado is not None else None
+        return self._estimar_eta(trabajo, esperando, en_ejecucion)
+
+    def eta(self, trabajo):
+        """ETA actualizada (instante de finalización) de un trabajo en cola o en curso"""
+        with self._bloqueo_global():
+            return self._eta(trabajo, *self._leer_estado())
+
+    def _registrar_fin(self, trabajo):
+        """Actualiza el factor de tiempo real compartido y el error de la ETA.
+
+        El factor solo usa el tiempo medido con trabajo.medir(); si la
+        función no lo usa, no se actualiza. Requiere el bloqueo global.
+        """
+        if trabajo.eta is not None:
+            self._errores_eta.append(trabajo.terminado - trabajo.eta)
+        if not trabajo.duracion or trabajo.segundos_proceso is None:
+            return
+        rtf = trabajo.segundos_proceso / trabajo.duracion
+        compartido = _leer_numeros(self._path_rtf)
+        anterior = compartido.get(trabajo.modelo, self._rtf.get(trabajo.modelo, rtf))
+        compartido[trabajo.modelo] = (1 - PESO_RTF) * anterior + PESO_RTF * rtf
+        _escribir_json(self._path_rtf, compartido)
+        self._rtf.update(compartido)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def metricas(self):
+        """Profundidad de cola, tiempos de espera y precisión de las ETA.
+
+        La cola, los trabajos en ejecución y el factor de tiempo real son los
+        de todos los procesos; las esperas y los errores de ETA, los de este.
+        """
+        with self._bloqueo_global():
+            esperando, en_ejecucion = self._leer_estado()
+        profundidad = {
+            nombre: sum(1 for e in esperando if e["prioridad"] == p)
+            for p, nombre in NOMBRES_PRIORIDAD.items()
+        }
+        with self._lock:
+            esperas = list(self._esperas)
+            errores = list(self._errores_eta)
+            return {
+                "cola": profundidad,
+                "en_ejecucion": len(en_ejecucion),
+                "memoria_en_uso_mb": sum(e["memoria_mb"] for e in en_ejecucion),
+                "espera_media_s": sum(esperas) / len(esperas) if esperas else None,
+                "espera_max_s": max(esperas) if esperas else None,
+                "eta_error_medio_s": sum(errores) / len(errores) if errores else None,
+                "eta_error_abs_medio_s": sum(abs(e) for e in errores) / len(errores) if errores else None,
+                "rtf": dict(self._rtf),
+            }
+
+    def exportar_metricas(self, ruta):
+        """Guarda las métricas en un archivo JSON"""
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.metricas(), f, indent=2)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Transcribe un lote de archivos en segundo plano")
+    parser.add_argument("archivos", nargs="+", help="Archivos de audio")
+    parser.add_argument("--modelo", default="small", choices=list(MEMORIA_MODELO_MB))
+    parser.add_argument("--idioma", default="es", help="Código de idioma (vacío para detectar)")
+    parser.add_argument("--prioridad", default="lote", choices=list(NOMBRES_PRIORIDAD.values()))
+    parser.add_argument("--origen", default="lote", help="Nombre del origen para el reparto justo")
+    parser.add_argument("--trabajos", type=int, default=1, help="Transcripciones simultáneas")
+    parser.add_argument("--metricas", help="Archivo JSON donde exportar las métricas al terminar")
+    args = parser.parse_args()
+
+    from transcriptor import setup_ffmpeg, get_models_dir, get_vocabulary_path
+    setup_ffmpeg()
+
+    import whisper
+    from postproceso import Postprocesador
+
+    postprocesador = Postprocesador.desde_archivo(get_vocabulary_path())
+
+    modelos = {}
+    modelos_lock = threading.Lock()
+
+    def transcribir(trabajo):
+        with modelos_lock:
+            if trabajo.modelo not in modelos:
+                modelos[trabajo.modelo] = whisper.load_model(trabajo.modelo, download_root=get_models_dir(trabajo.modelo))
+        with trabajo.medir():
+            result = modelos[trabajo.modelo].transcribe(
+                trabajo.audio_path, language=args.idioma or None, fp16=False, verbose=None,
+                initial_prompt=postprocesador.prompt()
+            )
+        segmentos = postprocesador.procesar_segmentos(result["segments"])
+        output_file = os.path.splitext(trabajo.audio_path)[0] + "_transcripcion.txt"
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write("".join(s["text"] for s in segmentos))
+        return output_file
+
+    prioridad = {v: k for k, v in NOMBRES_PRIORIDAD.items()}[args.prioridad]
+    planificador = Planificador(max_trabajos=args.trabajos)
+    trabajos = [planificador.enviar(transcribir, a, args.modelo, prioridad, args.origen) for a in args.archivos]
+
+    for trabajo in trabajos:
+        if trabajo.estimacion.result():
+            print(f"[{trabajo.id}] {os.path.basename(trabajo.audio_path)}: "
+                  f"ETA {time.strftime('%H:%M:%S', time.localtime(trabajo.eta))}")
+
+    errores = 0
+    for trabajo in trabajos:
+        try:
+            print(f"✅ [{trabajo.id}] {trabajo.result()}")
+        except Exception as e:
+            errores += 1
+            print(f"❌ [{trabajo.id}] {trabajo.audio_path}: {e}")
+
+    metricas = planificador.metricas()
+    print(json.dumps(metricas, indent=2))
+    if args.metricas:
+        planificador.exportar_metricas(args.metricas)
+
+    sys.exit(1 if errores else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Whisper Transcriptor - Postproceso del texto
+Corrige la transcripción con un vocabulario propio (nombres de productos,
+personas, términos del dominio) y normaliza espacios, puntuación y
+mayúsculas al inicio de frase.
+
+Formato de vocabulario.txt (junto a la aplicación):
+
+    # Comentario (también al final de una línea, tras un espacio)
+    C#                        -> "#" pegado a una palabra no es comentario
+    OpenAI                    -> se escribe siempre así (sin importar mayúsculas)
+    open ai => OpenAI         -> reemplaza "open ai" por "OpenAI"
+    whisper, güisper => Whisper
+
+Todas las reglas se compilan en una única expresión regular, de modo que
+cada segmento se recorre una sola vez sin importar cuántas reglas haya.
+El vocabulario se aplica después de la normalización, así que su forma
+manda también al inicio de frase ("iPhone", no "IPhone").
+Los términos también se pasan a Whisper como initial_prompt para que
+tienda a escribirlos bien desde el principio.
+"""
+
+import os
+import re
+
+# Longitud máxima del prompt (Whisper admite ~224 tokens)
+MAX_PROMPT = 600
+
+# Normalización: espacio antes de puntuación, espacios repetidos
+_ESPACIO_PUNTUACION = re.compile(r"\s+([,.;:!?…)\]»])")
+_ESPACIOS = re.compile(r"\s{2,}")
+# Primera letra de cada frase (tras . ! ? … o al inicio), incluidos ¿ ¡ iniciales
+_INICIO_FRASE = re.compile(r"(^|[.!?…]\s+)([¿¡\"«(]*)(\w)")
+# Comentario del vocabulario: "#" al inicio de línea o tras un espacio
+_COMENTARIO = re.compile(r"(^|\s)#.*$")
+
+
+def termina_frase(texto):
+    """True/False según si texto acaba una frase; None si no hay nada que mirar"""
+    final = texto.rstrip().rstrip("\"»)")[-1:]
+    if not final:
+        return None
+    return final in ".!?…"
+
+
+def cargar_vocabulario(path):
+    """Lee un archivo de vocabulario y devuelve un dict {variante en minúsculas: forma correcta}"""
+    reglas = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for linea in f:
+            linea = _COMENTARIO.sub("", linea.rstrip("\n")).strip()
+            if not linea:
+                continue
+            if "=>" in linea:
+                variantes, correcto = (parte.strip() for parte in linea.split("=>", 1))
+                for variante in variantes.split(","):
+                    if variante.strip():
+                        reglas[variante.strip().lower()] = correcto
+                # La forma correcta también normaliza sus propias mayúsculas
+                reglas.setdefault(correcto.lower(), correcto)
+            else:
+                reglas[linea.lower()] = linea
+    return reglas
+
+
+class Postprocesador:
+    """Aplica el vocabulario y la normalización segmento a segmento.
+
+    Args:
+        reglas: dict {variante en minúsculas: forma correcta}
+        normalizar: si se corrigen espacios, puntuación y mayúsculas
+    """
+
+    def __init__(self, reglas=None, normalizar=True):
+        self.reglas = reglas or {}
+        self.normalizar = normalizar
+        self._patron = None
+        if self.reglas:
+            # Las variantes largas primero para que "open ai studio" gane a "open ai"
+            variantes = sorted(self.reglas, key=len, reverse=True)
+            self._patron = re.compile(
+                r"(?<!\w)(?:" + "|".join(re.escape(v) for v in variantes) + r")(?!\w)",
+                re.IGNORECASE,
+            )
+
+    @classmethod
+    def desde_archivo(cls, path, normalizar=True):
+        """Crea el postprocesador con el vocabulario de path, si el archivo existe"""
+        if path and os.path.exists(path):
+            return cls(cargar_vocabulario(path), normalizar)
+        return cls(normalizar=normalizar)
+
+    def terminos(self):
+        """Formas correctas del vocabulario, sin repetir"""
+        return list(dict.fromkeys(self.reglas.values()))
+
+    def prompt(self):
+        """Texto para initial_prompt que orienta a Whisper hacia el vocabulario"""
+        if not self.reglas:
+            return None
+        prompt = "Glosario: "
+        for termino in self.terminos():
+            if len(prompt) + len(termino) + 2 > MAX_PROMPT:
+                break
+            prompt += termino + ", "
+        return prompt.rstrip(", ") + "."
+
+    def _reemplazar(self, match):
+        return self.reglas.get(match.group(0).lower(), match.group(0))
+
+    def procesar_texto(self, texto, inicio_frase=True):
+        """Procesa un fragmento; inicio_frase indica si empieza una frase nueva"""
+        if self.normalizar:
+            texto = _ESPACIOS.sub(" ", _ESPACIO_PUNTUACION.sub(r"\1", texto))
+
+            def mayuscula(match):
+                # A mitad de frase el primer carácter del fragmento se deja como está
+                if match.start() == 0 and not match.group(1) and not inicio_frase:
+                    return match.group(0)
+                return match.group(1) + match.group(2) + match.group(3).upper()
+
+            texto = _INICIO_FRASE.sub(mayuscula, texto)
+
+        # El vocabulario va al final para que sus mayúsculas no se alteren
+        if self._patron is not None:
+            texto = self._patron.sub(self._reemplazar, texto)
+        return texto
+
+    def procesar_segmentos(self, segmentos, inicio_frase=True):
+        """Procesa los segmentos de Whisper en orden, modificándolos en el sitio.
+
+        inicio_frase indica si el primer segmento empieza frase (para continuar
+        un texto ya procesado, como en el dictado en vivo).
+        """
+        for segmento in segmentos:
+            texto = segmento["text"]
+            # Conservar el espacio inicial con el que Whisper une los segmentos
+            espacio = texto[:len(texto) - len(texto.lstrip())]
+            procesado = self.procesar_texto(texto.strip(), inicio_frase)
+            segmento["text"] = espacio + procesado
+            # Un segmento vacío o solo de comillas no cambia si empieza frase
+            termina = termina_frase(procesado)
+            if termina is not None:
+                inicio_frase = termina
+        return segmentos
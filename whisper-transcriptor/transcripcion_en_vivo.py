@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Whisper Transcriptor - Transcripción en vivo
+Transcribe audio mientras se está grabando (dictado) usando ventanas
+deslizantes sobre un modelo cargado una sola vez.
+
+El texto se divide en dos partes:
+- Confirmado: segmentos que coinciden en dos pasadas seguidas. No cambian
+  y se añaden al archivo de salida.
+- Provisional: la cola inestable, que se vuelve a transcribir en cada paso.
+
+Uso:
+    python transcripcion_en_vivo.py --modelo base
+    ffmpeg -i audio.mp3 -f s16le -ac 1 -ar 16000 - | python transcripcion_en_vivo.py --stdin
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from postproceso import Postprocesador, termina_frase
+
+SAMPLE_RATE = 16000
+
+# Si una pasada no encuentra voz, solo se conserva este final del buffer
+# (puede contener el inicio de una palabra todavía no reconocida)
+CONSERVAR_SIN_VOZ = 1.0
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) de una lista de valores"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+# ----------------------------------------------------------------------
+# Fuentes de audio
+# ----------------------------------------------------------------------
+
+class FuenteAudio:
+    """Fuente de audio base: entrega bloques float32 mono a 16 kHz por una cola"""
+
+    def __init__(self):
+        self.cola = queue.Queue()
+        self._detenida = threading.Event()
+
+    def iniciar(self):
+        raise NotImplementedError
+
+    def detener(self):
+        """Detiene la captura; el consumidor recibirá None al final"""
+        if not self._detenida.is_set():
+            self._detenida.set()
+            self.cola.put(None)
+
+    @property
+    def detenida(self):
+        return self._detenida.is_set()
+
+
+class FuenteMicrofono(FuenteAudio):
+    """Captura del micrófono mediante sounddevice.
+
+    detener() puede llamarse antes que iniciar() (por ejemplo mientras se
+    carga el modelo); en ese caso iniciar() ya no abre el micrófono.
+    """
+
+    def __init__(self, dispositivo=None, bloque=0.1):
+        super().__init__()
+        self.dispositivo = dispositivo
+        self.bloque = bloque
+        self._stream = None
+        self._lock_stream = threading.Lock()
+
+    def iniciar(self):
+        try:
+            import sounddevice as sd
+        except ImportError:
+            raise RuntimeError("sounddevice no está instalado. Ejecuta: pip install sounddevice")
+
+        def callback(indata, frames, tiempo, status):
+            if not self.detenida:
+                self.cola.put(indata[:, 0].copy())
+
+        with self._lock_stream:
+            if self.detenida:
+                return
+            self._stream = sd.InputStream(
+                samplerate=SAMPLE_RATE,
+                channels=1,
+                dtype="float32",
+                blocksize=int(SAMPLE_RATE * self.bloque),
+                device=self.dispositivo,
+                callback=callback,
+            )
+            self._stream.start()
+
+    def detener(self):
+        with self._lock_stream:
+            if self._stream is not None:
+                self._stream.stop()
+                self._stream.close()
+                self._stream = None
+            super().detener()
+
+
+class FuentePCM(FuenteAudio):
+    """Lee PCM s16le mono a 16 kHz de un flujo binario (por defecto stdin)"""
+
+    def __init__(self, flujo=None, bloque=0.1):
+        super().__init__()
+        self.flujo = flujo if flujo is not None else sys.stdin.buffer
+        self.bytes_bloque = int(SAMPLE_RATE * bloque) * 2
+
+    def iniciar(self):
+        hilo = threading.Thread(target=self._leer, daemon=True)
+        hilo.start()
+
+    def _leer(self):
+        resto = b""
+        while not self.detenida:
+            datos = self.flujo.read(self.bytes_bloque)
+            if not datos:
+                break
+            datos = resto + datos
+            usable = len(datos) - len(datos) % 2
+            resto = datos[usable:]
+            muestras = np.frombuffer(datos[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+            self.cola.put(muestras)
+        self.detener()
+
+
+# ----------------------------------------------------------------------
+# Transcripción incremental
+# ----------------------------------------------------------------------
+
+class TranscriptorEnVivo:
+    """Transcribe un flujo de audio por ventanas, confirmando los segmentos estables.
+
+    Args:
+        model: modelo de whisper ya cargado (se mantiene residente)
+        idioma: código de idioma o None para detectar
+        paso: segundos de audio nuevo entre pasadas
+        ventana_max: si el audio pendiente supera esta duración se confirma
+            todo menos el último segmento (o ése, si es el único) aunque no
+            sea estable
+        margen: los segmentos que terminan a menos de estos segundos del
+            final del audio se consideran inestables; el último segmento se
+            confirma cuando va seguido de al menos este silencio
+        on_confirmado: callback(texto) con cada fragmento confirmado
+        on_provisional: callback(texto) con la cola provisional actual
+        archivo_salida: si se indica, el texto confirmado se añade a este archivo
+        postprocesador: Postprocesador con el vocabulario; su glosario se pasa
+            en el prompt y corrige los segmentos antes de confirmarlos
+    """
+
+    def __init__(self, model, idioma="es", paso=1.0, ventana_max=12.0, margen=0.5,
+                 on_confirmado=None, on_provisional=None, archivo_salida=None,
+                 postprocesador=None):
+        self.model = model
+        self.idioma = idioma
+        self.paso = paso
+        self.ventana_max = ventana_max
+        self.margen = margen
+        self.on_confirmado = on_confirmado
+        self.on_provisional = on_provisional
+        self.archivo_salida = archivo_salida
+        self.postprocesador = postprocesador
+
+        self.latencias = []
+        self.texto_confirmado = ""
+
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._inicio_buffer = 0       # muestra absoluta del inicio del buffer
+        self._llegadas = []           # (muestra absoluta final del bloque, instante de llegada)
+        self._hipotesis_anterior = []
+
+    @property
+    def _muestras_totales(self):
+        return self._inicio_buffer + len(self._buffer)
+
+    def procesar(self, fuente):
+        """Consume la fuente hasta que se detenga y devuelve el texto confirmado"""
+        fuente.iniciar()
+        pendiente = 0
+        terminado = False
+
+        while not terminado:
+            bloques = [fuente.cola.get()]
+            # Tomar todo lo que haya llegado mientras se transcribía
+            while True:
+                try:
+                    bloques.append(fuente.cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            ahora = time.perf_counter()
+            for bloque in bloques:
+                if bloque is None:
+                    terminado = True
+                    break
+                self._buffer = np.concatenate([self._buffer, bloque])
+                self._llegadas.append((self._muestras_totales, ahora))
+                pendiente += len(bloque)
+
+            if pendiente >= self.paso * SAMPLE_RATE:
+                pendiente = 0
+                self._actualizar()
+
+        self._actualizar(final=True)
+        return self.texto_confirmado
+
+    def _inicio_frase(self):
+        """Si lo siguiente que se confirme empieza una frase nueva"""
+        termina = termina_frase(self.texto_confirmado)
+        return True if termina is None else termina
+
+    def _transcribir_buffer(self):
+        glosario = self.postprocesador.prompt() if self.postprocesador else None
+        prompt = " ".join(p for p in (glosario, self.texto_confirmado[-200:].strip()) if p) or None
+        result = self.model.transcribe(
+            self._buffer,
+            language=self.idioma,
+            fp16=False,
+            verbose=None,
+            condition_on_previous_text=False,
+            initial_prompt=prompt,
+        )
+        return [s for s in result["segments"] if s["text"].strip()]
+
+    def _actualizar(self, final=False):
+        """Transcribe el buffer pendiente y confirma los segmentos estables"""
+        if len(self._buffer) < SAMPLE_RATE * 0.3:
+            return
+
+        segmentos = self._transcribir_buffer()
+        duracion = len(self._buffer) / SAMPLE_RATE
+
+        if not segmentos:
+            # Sin voz: descartar el silencio para que el buffer no crezca
+            self._recortar(max(0, len(self._buffer) - int(CONSERVAR_SIN_VOZ * SAMPLE_RATE)))
+            self._hipotesis_anterior = []
+            if self.on_provisional:
+                self.on_provisional("")
+            return
+
+        if final:
+            estables = len(segmentos)
+        else:
+            # Estable = terminó antes del margen (le sigue silencio o más voz)
+            # y coincide con la pasada anterior; incluye el último segmento
+            estables = 0
+            for i, segmento in enumerate(segmentos):
+                if segmento["end"] > duracion - self.margen:
+                    break
+                if i >= len(self._hipotesis_anterior) or \
+                        segmento["text"].strip() != self._hipotesis_anterior[i]:
+                    break
+                estables = i + 1
+
+            # Ventana demasiado larga: forzar la confirmación para acotar el coste
+            if duracion > self.ventana_max:
+                estables = max(estables, len(segmentos) - 1 if len(segmentos) > 1 else 1)
+
+        if estables:
+            self._confirmar(segmentos[:estables])
+
+        restantes = segmentos[estables:]
+        self._hipotesis_anterior = [s["text"].strip() for s in restantes]
+
+        if self.on_provisional:
+            provisional = "" if final else "".join(s["text"] for s in restantes).strip()
+            if provisional and self.postprocesador:
+                provisional = self.postprocesador.procesar_texto(provisional, self._inicio_frase())
+            self.on_provisional(provisional)
+
+    def _confirmar(self, segmentos):
+        """Añade los segmentos a la salida y descarta su audio del buffer"""
+        corte = min(len(self._buffer), int(segmentos[-1]["end"] * SAMPLE_RATE))
+        fin_absoluto = self._inicio_buffer + corte
+
+        # Latencia: desde que llegó el audio del final del segmento hasta ahora
+        ahora = time.perf_counter()
+        for muestra_fin, llegada in self._llegadas:
+            if muestra_fin >= fin_absoluto:
+                self.latencias.append(ahora - llegada)
+                break
+
+        self._recortar(corte)
+
+        # El estado de frase continúa desde el texto ya confirmado
+        if self.postprocesador:
+            self.postprocesador.procesar_segmentos(segmentos, self._inicio_frase())
+        texto = "".join(s["text"] for s in segmentos)
+
+        self.texto_confirmado += texto
+        if self.archivo_salida:
+            with open(self.archivo_salida, "a", encoding="utf-8") as f:
+                f.write(texto)
+        if self.on_confirmado:
+            self.on_confirmado(texto)
+
+    def _recortar(self, corte):
+        """Descarta las primeras `corte` muestras del buffer"""
+        self._buffer = self._buffer[corte:]
+        self._inicio_buffer += corte
+        self._llegadas = [(m, t) for m, t in self._llegadas if m > self._inicio_buffer]
+
+    def resumen_latencia(self):
+        """Devuelve un texto con los percentiles de latencia medidos"""
+        if not self.latencias:
+            return "Latencia: sin datos"
+        p50, p90, p99 = (percentil(self.latencias, p) for p in (50, 90, 99))
+        return (f"Latencia ({len(self.latencias)} segmentos): "
+                f"p50={p50:.2f}s p90={p90:.2f}s p99={p99:.2f}s")
+
+
+def archivo_salida_por_defecto(carpeta):
+    """Nombre del archivo de salida para una sesión de dictado"""
+    marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(carpeta, f"dictado_{marca}_transcripcion.txt")
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Transcripción en vivo con Whisper")
+    parser.add_argument("--modelo", default="base", help="Modelo de Whisper (tiny o base recomendados)")
+    parser.add_argument("--idioma", default="es", help="Código de idioma (vacío para detectar)")
+    parser.add_argument("--stdin", action="store_true", help="Leer PCM s16le mono 16 kHz de stdin en lugar del micrófono")
+    parser.add_argument("--paso", type=float, default=1.0, help="Segundos entre pasadas")
+    parser.add_argument("--salida", help="Archivo donde añadir el texto confirmado")
+    args = parser.parse_args()
+
+    from transcriptor import setup_ffmpeg, get_app_path, get_models_dir, get_vocabulary_path
+    setup_ffmpeg()
+
+    import whisper
+
+    print(f"Cargando modelo '{args.modelo}'...", file=sys.stderr)
+    model = whisper.load_model(args.modelo, download_root=get_models_dir(args.modelo))
+
+    salida = args.salida or archivo_salida_por_defecto(str(get_app_path()))
+    fuente = FuentePCM() if args.stdin else FuenteMicrofono()
+
+    def on_confirmado(texto):
+        print(texto, end="", flush=True)
+
+    en_vivo = TranscriptorEnVivo(
+        model,
+        idioma=args.idioma or None,
+        paso=args.paso,
+        on_confirmado=on_confirmado,
+        archivo_salida=salida,
+        postprocesador=Postprocesador.desde_archivo(get_vocabulary_path()),
+    )
+
+    if not args.stdin:
+        print("🎤 Escuchando... (Ctrl+C para terminar)", file=sys.stderr)
+
+    hilo = threading.Thread(target=en_vivo.procesar, args=(fuente,), daemon=True)
+    hilo.start()
+    try:
+        while hilo.is_alive():
+            hilo.join(0.2)
+    except KeyboardInterrupt:
+        fuente.detener()
+        hilo.join()
+
+    print(file=sys.stderr)
+    print(en_vivo.resumen_latencia(), file=sys.stderr)
+    print(f"✅ Transcripción guardada en: {salida}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
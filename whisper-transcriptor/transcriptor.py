@@ -6,11 +6,16 @@ Convierte archivos de audio a texto usando OpenAI Whisper
 
 import os
 import sys
+import json
+import time
+import hashlib
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
 
+from planificador import Planificador, INTERACTIVA
+
 # Función para obtener la ruta base (funciona tanto en desarrollo como en ejecutable)
 def get_base_path():
     """Obtiene la ruta base del ejecutable o del script"""
@@ -28,6 +33,52 @@ def get_app_path():
     else:
         return Path(__file__).parent
 
+def get_vocabulary_path():
+    """Obtiene la ruta del vocabulario propio usado en el postproceso"""
+    return str(get_app_path() / "vocabulario.txt")
+
+# Modelos preinstalados ya verificados: (ruta, tamaño, fecha) -> válido
+_verified_models = {}
+
+def _verify_model_file(model_file, manifest_file):
+    """Comprueba el archivo de un modelo con su manifiesto <nombre>.json, si existe"""
+    if not manifest_file.exists():
+        return True
+    stat = model_file.stat()
+    key = (str(model_file), stat.st_size, stat.st_mtime)
+    if key not in _verified_models:
+        try:
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            sha = hashlib.sha256()
+            with open(model_file, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            _verified_models[key] = (entry.get("bytes") == stat.st_size and
+                                     entry.get("sha256") == sha.hexdigest())
+        except (OSError, ValueError, AttributeError):
+            _verified_models[key] = False
+    return _verified_models[key]
+
+def get_models_dir(model_name):
+    """Obtiene la carpeta de modelos preinstalados si contiene model_name.
+
+    Devuelve None (caché de Whisper) si el modelo no está en modelos/ o no
+    coincide con su checksum, para no descargarlo en la carpeta de la aplicación.
+    """
+    import whisper
+    
+    if model_name not in whisper._MODELS:
+        return None
+    models_dir = get_app_path() / "modelos"
+    model_file = models_dir / os.path.basename(whisper._MODELS[model_name])
+    if not model_file.exists():
+        return None
+    if not _verify_model_file(model_file, models_dir / f"{model_name}.json"):
+        print(f"⚠️ {model_file} no coincide con su checksum; se usará la caché de Whisper")
+        return None
+    return str(models_dir)
+
 # Configurar FFmpeg
 def setup_ffmpeg():
     """Configura las rutas de FFmpeg"""
@@ -84,8 +135,14 @@ class TranscriptorApp:
         self.audio_file = tk.StringVar()
         self.model_var = tk.StringVar(value="small")
         self.language_var = tk.StringVar(value="es")
+        self.diarize_var = tk.BooleanVar(value=False)
         self.is_transcribing = False
         self.model = None
+        self.model_name = None
+        self.live_source = None
+        
+        # Planificador: los trabajos de la interfaz tienen prioridad interactiva
+        self.scheduler = Planificador(max_trabajos=1)
         
         # Configurar estilo
         self.setup_style()
@@ -169,9 +226,20 @@ class TranscriptorApp:
         lang_combo.bind("<<ComboboxSelected>>", lambda e: self.language_var.set(self.lang_map.get(lang_combo.get(), "es") or ""))
         lang_combo.pack(side=tk.LEFT)
         
-        # Botón de transcribir
-        self.transcribe_btn = ttk.Button(main_frame, text="🎯 Iniciar Transcripción", command=self.start_transcription)
-        self.transcribe_btn.pack(pady=15)
+        # Hablantes
+        diarize_check = ttk.Checkbutton(options_frame, text="Identificar hablantes (genera también .srt y .json)",
+                                        variable=self.diarize_var)
+        diarize_check.pack(anchor=tk.W, pady=(10, 0))
+        
+        # Botones de transcribir
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.pack(pady=15)
+        
+        self.transcribe_btn = ttk.Button(buttons_frame, text="🎯 Iniciar Transcripción", command=self.start_transcription)
+        self.transcribe_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.live_btn = ttk.Button(buttons_frame, text="🎤 Dictado en vivo", command=self.toggle_live)
+        self.live_btn.pack(side=tk.LEFT)
         
         # Barra de progreso
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
@@ -256,61 +324,186 @@ class TranscriptorApp:
         
         self.is_transcribing = True
         self.transcribe_btn.config(state=tk.DISABLED)
+        self.live_btn.config(state=tk.DISABLED)
         self.progress.start(10)
         self.result_text.delete(1.0, tk.END)
         self.copy_btn.config(state=tk.DISABLED)
         self.save_btn.config(state=tk.DISABLED)
         
-        # Ejecutar en hilo separado
-        thread = threading.Thread(target=self.transcribe_audio, args=(audio_path,))
+        # Encolar en el planificador (se ejecuta en un hilo separado)
+        try:
+            job = self.scheduler.enviar(
+                self.transcribe_audio, audio_path, self.model_var.get(),
+                prioridad=INTERACTIVA, origen="gui"
+            )
+        except Exception as e:
+            self.transcription_error(str(e))
+            return
+        self.update_status("En cola")
+        job.estimacion.add_done_callback(lambda f: self.root.after(0, lambda: self.show_queued_eta(job)))
+        job.future.add_done_callback(lambda f: self.root.after(0, self.export_metrics))
+    
+    def show_queued_eta(self, job):
+        """Muestra la ETA de un trabajo que sigue en cola"""
+        if job.iniciado is None and self.is_transcribing:
+            self.update_status(f"En cola{self.format_eta(job.eta)}")
+    
+    def format_eta(self, eta):
+        """Devuelve el texto de una ETA o cadena vacía si no se conoce"""
+        if eta is None:
+            return ""
+        return f" — ETA {time.strftime('%H:%M:%S', time.localtime(eta))}"
+    
+    def get_model(self):
+        """Devuelve el modelo seleccionado, reutilizándolo si ya está cargado"""
+        import whisper
+        
+        model_name = self.model_var.get()
+        if self.model is None or self.model_name != model_name:
+            self.update_status(f"Cargando modelo '{model_name}'... (puede tardar la primera vez)")
+            self.model = whisper.load_model(model_name, download_root=get_models_dir(model_name))
+            self.model_name = model_name
+        return self.model
+    
+    def toggle_live(self):
+        """Inicia o detiene el dictado en vivo desde el micrófono"""
+        if self.live_source is not None:
+            self.live_source.detener()
+            self.live_btn.config(state=tk.DISABLED)
+            self.update_status("Finalizando dictado...")
+            return
+        
+        if self.is_transcribing:
+            return
+        
+        from transcripcion_en_vivo import FuenteMicrofono
+        
+        self.is_transcribing = True
+        self.live_source = FuenteMicrofono()
+        self.transcribe_btn.config(state=tk.DISABLED)
+        self.live_btn.config(text="⏹️ Detener dictado")
+        self.result_text.delete(1.0, tk.END)
+        self.copy_btn.config(state=tk.DISABLED)
+        self.save_btn.config(state=tk.DISABLED)
+        
+        thread = threading.Thread(target=self.live_transcription, args=(self.live_source,))
         thread.daemon = True
         thread.start()
     
-    def transcribe_audio(self, audio_path):
-        """Realiza la transcripción del audio"""
+    def live_transcription(self, source):
+        """Ejecuta el dictado en vivo hasta que se detenga la fuente"""
         try:
-            self.update_status("Cargando modelo Whisper...")
+            from transcripcion_en_vivo import TranscriptorEnVivo, archivo_salida_por_defecto
+            from postproceso import Postprocesador
             
-            import whisper
+            model = self.get_model()
+            output_file = archivo_salida_por_defecto(str(get_app_path()))
+            language = self.language_var.get() if self.language_var.get() else None
+            
+            live = TranscriptorEnVivo(
+                model,
+                idioma=language,
+                on_confirmado=lambda text: self.root.after(0, lambda: self.result_text.insert(tk.END, text)),
+                on_provisional=lambda text: self.root.after(0, lambda: self.status_label.config(text=f"🎤 {text}")),
+                archivo_salida=output_file,
+                postprocesador=Postprocesador.desde_archivo(get_vocabulary_path()),
+            )
+            
+            self.root.after(0, lambda: self.update_status("🎤 Escuchando..."))
+            live.procesar(source)
+            
+            self.root.after(0, lambda: self.live_complete(output_file, live.resumen_latencia()))
             
-            model_name = self.model_var.get()
+        except Exception as e:
+            source.detener()
+            error_msg = str(e)
+            self.root.after(0, lambda: self.transcription_error(error_msg))
+    
+    def live_complete(self, output_file, latency_summary):
+        """Maneja el fin del dictado en vivo"""
+        self.is_transcribing = False
+        self.live_source = None
+        self.transcribe_btn.config(state=tk.NORMAL)
+        self.live_btn.config(text="🎤 Dictado en vivo", state=tk.NORMAL)
+        self.copy_btn.config(state=tk.NORMAL)
+        self.save_btn.config(state=tk.NORMAL)
+        
+        self.update_status(f"✅ Dictado guardado en: {Path(output_file).name} — {latency_summary}")
+    
+    def transcribe_audio(self, job):
+        """Realiza la transcripción del audio de un trabajo del planificador"""
+        audio_path = job.audio_path
+        try:
+            self.update_status("Cargando modelo Whisper...")
             
             # Cargar modelo (se descarga automáticamente si no existe)
-            self.update_status(f"Cargando modelo '{model_name}'... (puede tardar la primera vez)")
-            model = whisper.load_model(model_name)
+            model = self.get_model()
             
-            self.update_status("Transcribiendo audio... Por favor espera.")
+            self.update_status(f"Transcribiendo audio... Por favor espera.{self.format_eta(self.scheduler.eta(job))}")
             
             # Configurar idioma
             language = self.language_var.get() if self.language_var.get() else None
             
-            # Realizar transcripción
-            result = model.transcribe(
-                audio_path,
-                language=language,
-                fp16=False,
-                verbose=False
-            )
+            # Decodificar una sola vez: lo comparten la transcripción y la diarización
+            import whisper
+            audio = whisper.load_audio(audio_path)
+            
+            # Vocabulario propio: orienta a Whisper y corrige el texto después
+            from postproceso import Postprocesador
+            postprocessor = Postprocesador.desde_archivo(get_vocabulary_path())
             
-            transcription = result["text"]
+            options = {"initial_prompt": postprocessor.prompt()}
+            diarizer = None
+            if self.diarize_var.get():
+                import diarizacion
+                regions = diarizacion.detectar_voz(audio)
+                diarizer = diarizacion.Diarizador(audio, regions).iniciar()
+            
+            # Realizar transcripción (solo esto cuenta para el factor de tiempo real)
+            with job.medir():
+                result = model.transcribe(
+                    audio,
+                    language=language,
+                    fp16=False,
+                    verbose=False,
+                    **options
+                )
+            
+            segments = postprocessor.procesar_segmentos(result["segments"])
+            transcription = "".join(segment["text"] for segment in segments)
+            base_path = os.path.splitext(audio_path)[0] + "_transcripcion"
+            
+            warning = None
+            if diarizer is not None:
+                self.update_status("Asignando hablantes...")
+                try:
+                    labeled = diarizer.etiquetar([dict(segment) for segment in segments])
+                    diarizacion.guardar_salidas(labeled, base_path)
+                    transcription = diarizacion.formatear_texto(labeled)
+                except Exception as e:
+                    # La transcripción sigue siendo válida sin etiquetas de hablante
+                    warning = f"no se pudieron identificar los hablantes ({e})"
             
             # Guardar automáticamente
-            output_file = os.path.splitext(audio_path)[0] + "_transcripcion.txt"
+            output_file = base_path + ".txt"
             with open(output_file, "w", encoding="utf-8") as f:
                 f.write(transcription)
             
             # Actualizar UI en el hilo principal
-            self.root.after(0, lambda: self.transcription_complete(transcription, output_file))
+            self.root.after(0, lambda: self.transcription_complete(transcription, output_file, warning))
             
         except Exception as e:
             error_msg = str(e)
             self.root.after(0, lambda: self.transcription_error(error_msg))
+            # El planificador debe saber que el trabajo falló
+            raise
     
-    def transcription_complete(self, text, output_file):
+    def transcription_complete(self, text, output_file, warning=None):
         """Maneja la finalización exitosa de la transcripción"""
         self.is_transcribing = False
         self.progress.stop()
         self.transcribe_btn.config(state=tk.NORMAL)
+        self.live_btn.config(state=tk.NORMAL)
         
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, text)
@@ -318,14 +511,26 @@ class TranscriptorApp:
         self.copy_btn.config(state=tk.NORMAL)
         self.save_btn.config(state=tk.NORMAL)
         
-        self.update_status(f"✅ Transcripción completada y guardada en: {Path(output_file).name}")
+        if warning:
+            self.update_status(f"⚠️ Transcripción guardada en: {Path(output_file).name} — {warning}")
+        else:
+            self.update_status(f"✅ Transcripción completada y guardada en: {Path(output_file).name}")
         messagebox.showinfo("Completado", f"Transcripción guardada en:\n{output_file}")
     
+    def export_metrics(self):
+        """Guarda las métricas del planificador junto a la aplicación"""
+        try:
+            self.scheduler.exportar_metricas(str(get_app_path() / "metricas_planificador.json"))
+        except OSError:
+            pass
+    
     def transcription_error(self, error):
         """Maneja los errores de transcripción"""
         self.is_transcribing = False
+        self.live_source = None
         self.progress.stop()
         self.transcribe_btn.config(state=tk.NORMAL)
+        self.live_btn.config(text="🎤 Dictado en vivo", state=tk.NORMAL)
         
         self.update_status(f"❌ Error: {error}")
         messagebox.showerror("Error", f"Error durante la transcripción:\n{error}")
@@ -375,6 +580,13 @@ def main():
     # Crear aplicación
     app = TranscriptorApp(root)
     
+    # Usado por build_exe.py para medir el tiempo de arranque
+    if "--medir-arranque" in sys.argv:
+        def measure_startup():
+            import whisper
+            root.destroy()
+        root.after(0, measure_startup)
+    
     # Ejecutar
     root.mainloop()
 